@@ -306,6 +306,9 @@ for group, job, conf, jid, n in run_jobs:
             output_correlator.write(corr_tag, corr)
             g.message("Correlator %s\n" % corr_tag, corr)
 
+        # make correlators of this source persistent
+        output_correlator.flush()
+
     # prepare sources
     vol3d = (
         l_exact.U_grid.fdimensions[0]
@@ -424,4 +427,6 @@ for group, job, conf, jid, n in run_jobs:
                     False,
                 )
 
+    output_correlator.close()
+
 del pin
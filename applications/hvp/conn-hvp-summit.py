@@ -456,6 +456,9 @@ for group, job, conf, jid, n in run_jobs:
             output_correlator.write(corr_tag, corr)
             g.message("Correlator %s\n" % corr_tag, corr)
 
+        # make correlators of this source persistent
+        output_correlator.flush()
+
     # prepare sources
     vol3d = (
         l_exact.U_grid.fdimensions[0]
@@ -552,3 +555,5 @@ for group, job, conf, jid, n in run_jobs:
                     "low-pnt",
                     False,
                 )
+
+    output_correlator.close()
@@ -36,4 +36,23 @@ Benchmark RNG engine {engine} in {precision.__name__} precision
                     f"uniform_real({lattice.__name__}) iteration {i}: {gb/(t1-t0)} GB/s"
                 )
 
+            # freshly allocated destination, pages are first touched while sampling
+            for i in range(3):
+                t0 = g.time()
+                dst = rng.uniform_real(lattice(grid))
+                t1 = g.time()
+                g.message(
+                    f"uniform_real(new {lattice.__name__}) iteration {i}: {gb/(t1-t0)} GB/s"
+                )
+
+            # previous implementation copied the result to optimize memory mapping
+            for i in range(3):
+                t0 = g.time()
+                dst = rng.uniform_real(lattice(grid))
+                dst.swap(g.copy(dst))
+                t1 = g.time()
+                g.message(
+                    f"uniform_real(new {lattice.__name__}) with copy iteration {i}: {gb/(t1-t0)} GB/s"
+                )
+
             g.message("")
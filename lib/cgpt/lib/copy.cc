@@ -214,6 +214,25 @@ EXPORT(copy_create_view_from_lattice,{
     return PyLong_FromVoidPtr(v);
   });
 
+EXPORT(copy_create_view_from_lattice_runs,{
+    PyObject* runs, * vlat, * tidx;
+    
+    if (!PyArg_ParseTuple(args, "OOO", &vlat, &runs, &tidx)) {
+      return NULL;
+    }
+
+    ASSERT(cgpt_PyArray_Check(runs));
+    ASSERT(cgpt_PyArray_Check(tidx));
+
+    cgpt_gm_view* v = new cgpt_gm_view();
+    GridBase* grid = cgpt_copy_append_view_from_vlattice(v->view,vlat,0,1,(PyArrayObject*)runs,(PyArrayObject*)tidx,true);
+
+    v->comm = grid->communicator;
+    v->rank = grid->_processor;
+    
+    return PyLong_FromVoidPtr(v);
+  });
+
 EXPORT(copy_create_view,{
 
     long _grid;
@@ -329,6 +329,7 @@ static void cgpt_coordinates_to_memory_offsets(std::vector<long>& c_rank,
 
   ASSERT(PyArray_NDIM(coordinates) == 2);
   long* tdim = PyArray_DIMS(coordinates);
+
   long nc = tdim[0];
   ASSERT(tdim[1] == grid->Nd());
   ASSERT(PyArray_TYPE(coordinates)==NPY_INT32);
@@ -357,21 +358,77 @@ static void cgpt_coordinates_to_memory_offsets(std::vector<long>& c_rank,
     }
 }
 
+// Blocks of runs of (start, count, stride) of the global lexicographic index
+// are filled directly without intermediate per-site index vectors.  The
+// view itself still holds one block per site and tensor index, i.e., runs
+// save the coordinate arrays but plan creation remains O(sites).
+static void cgpt_append_blocks_from_runs(gm_view& out,
+					 GridBase* grid,
+					 PyObject* vlat,
+					 PyArrayObject* runs,
+					 const std::vector<long>& t_indices,
+					 const std::vector<long>& t_offsets,
+					 long index_start, long index_stride,
+					 long sz_scalar, long sz_vector, long sz_vobj) {
+
+  cgpt_Lattice_base* l = (cgpt_Lattice_base*)PyLong_AsVoidPtr(PyList_GetItem(vlat,0));
+  int cb = l->get_checkerboard();
+
+  ASSERT(PyArray_NDIM(runs) == 2);
+  long* tdim = PyArray_DIMS(runs);
+  ASSERT(tdim[1] == 3);
+  long nruns = tdim[0];
+  int64_t* run = (int64_t*)PyArray_DATA(runs);
+
+  std::vector<long> run_offset(nruns + 1);
+  run_offset[0] = 0;
+  for (long r=0;r<nruns;r++)
+    run_offset[r+1] = run_offset[r] + run[3*r + 1];
+  long nc = run_offset[nruns];
+
+  size_t b0 = out.blocks.size();
+  out.blocks.resize(b0 + t_indices.size() * nc);
+  out.block_size = sz_scalar;
+
+  // thread over sites, a single run may cover the full local volume
+  Coordinate fdimensions = grid->_fdimensions;
+  thread_region
+    {
+      Coordinate site(grid->Nd());
+      thread_for_in_region (ci,nc,{
+	  long r = std::upper_bound(run_offset.begin(), run_offset.end(), ci) - run_offset.begin() - 1;
+	  int64_t L = run[3*r + 0] + (ci - run_offset[r]) * run[3*r + 2];
+	  for (int mu=0;mu<grid->Nd();mu++) {
+	    site[mu] = (int)(L % fdimensions[mu]);
+	    L /= fdimensions[mu];
+	  }
+	  ASSERT( cb == grid->CheckerBoard(site) );
+
+	  int odx, idx, rank;
+	  grid->GlobalCoorToRankIndex(rank,odx,idx,site);
+	  for (long i=0;i<t_indices.size();i++) {
+	    auto & b = out.blocks[b0 + ci * t_indices.size() + i];
+	    b.rank = rank;
+	    b.index = index_start + t_indices[i] * index_stride;
+	    b.start = idx * sz_scalar + t_offsets[i] * sz_vector + odx * sz_vobj;
+	  }
+	});
+    }
+}
+
 static GridBase* cgpt_copy_append_view_from_vlattice(gm_view& out,
 						     PyObject* vlat,
 						     long index_start, long index_stride,
 						     PyArrayObject* pos,
-						     PyArrayObject* tidx) {
+						     PyArrayObject* tidx,
+						     bool runs = false) {
 
-  ASSERT(PyArray_TYPE(pos) == NPY_INT32);
+  ASSERT(PyArray_TYPE(pos) == (runs ? NPY_INT64 : NPY_INT32));
   std::vector<long> t_indices, t_offsets, c_rank, c_odx, c_idx;
 
   // tensor dof
   cgpt_tensor_indices_to_memory_offsets(t_indices, t_offsets, vlat, index_start, index_stride, tidx);
 
-  // coordinate dof
-  cgpt_coordinates_to_memory_offsets(c_rank,c_odx,c_idx, vlat, pos);
-
   // get data layout
   long sz_scalar, sz_vector, sz_vobj;
   GridBase* grid;
@@ -379,6 +436,15 @@ static GridBase* cgpt_copy_append_view_from_vlattice(gm_view& out,
 
   // offset = idx * sz_scalar + tidx * sz_vector + odx * sz_vobj
   size_t b0 = out.blocks.size();
+
+  if (runs) {
+    cgpt_append_blocks_from_runs(out, grid, vlat, pos, t_indices, t_offsets,
+				 index_start, index_stride, sz_scalar, sz_vector, sz_vobj);
+    return grid;
+  }
+
+  // coordinate dof
+  cgpt_coordinates_to_memory_offsets(c_rank,c_odx,c_idx, vlat, pos);
   out.blocks.resize(b0 + t_indices.size() * c_rank.size());
 
   out.block_size = sz_scalar;
@@ -26,6 +26,7 @@ EXPORT_FUNCTION(copy_get_plan_info)
 EXPORT_FUNCTION(copy_execute_plan)
 EXPORT_FUNCTION(copy_cyclic_upscale)
 EXPORT_FUNCTION(copy_create_view_from_lattice)
+EXPORT_FUNCTION(copy_create_view_from_lattice_runs)
 EXPORT_FUNCTION(copy_create_view)
 EXPORT_FUNCTION(eval)
 EXPORT_FUNCTION(fp16_to_fp32)
@@ -93,7 +93,11 @@ EXPORT(fflush,{
     if (!PyArg_ParseTuple(args, "l", &_file)) {
       return NULL;
     }
-    return PyLong_FromLong((long)fflush((FILE*)_file));
+    long r;
+    Py_BEGIN_ALLOW_THREADS;
+    r = (long)fflush((FILE*)_file);
+    Py_END_ALLOW_THREADS;
+    return PyLong_FromLong(r);
   });
 
 EXPORT(fseek,{
@@ -132,7 +136,11 @@ EXPORT(fread,{
     void* d = buf->buf;
     long len = buf->len;
     ASSERT(len >= size);
-    return PyLong_FromLong(fread(d,size,1,(FILE*)_file));
+    long r;
+    Py_BEGIN_ALLOW_THREADS;
+    r = fread(d,size,1,(FILE*)_file);
+    Py_END_ALLOW_THREADS;
+    return PyLong_FromLong(r);
   });
 
 EXPORT(fwrite,{
@@ -148,5 +156,9 @@ EXPORT(fwrite,{
     void* s = buf->buf;
     long len = buf->len;
     ASSERT(len >= size);
-    return PyLong_FromLong(fwrite(s,size,1,(FILE*)_file));
+    long r;
+    Py_BEGIN_ALLOW_THREADS;
+    r = fwrite(s,size,1,(FILE*)_file);
+    Py_END_ALLOW_THREADS;
+    return PyLong_FromLong(r);
   });
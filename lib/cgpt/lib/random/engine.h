@@ -30,16 +30,12 @@ class cgpt_random_engine : public cgpt_random_engine_base {
   std::string _seed_str;
   cgpt_rng_engine cgpt_srng;
 
-  struct index_t {
-    int i,o; // adjust once grid adjusts
-  };
-  
   struct prng_t {
     std::vector<cgpt_rng_engine*> rng;
     std::vector<long> hash;
     std::vector<uint64_t> seed;
-    std::vector< std::vector< index_t > > samples;
-    long block, sites;
+    std::vector< size_t > site_sample; // oidx * isites + iidx -> block * sites / blocks + index in block
+    long block, sites, isites;
     std::string grid_tag;
   };
   
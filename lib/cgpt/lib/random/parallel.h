@@ -33,7 +33,6 @@ template<typename sRNG,typename pRNG>
 
   auto & block = prng.block;
   auto & sites = prng.sites;
-  auto & samples = prng.samples;
 
   if (nd <= 4) {
     for (long i=0;i<nd;i++)
@@ -46,6 +45,7 @@ template<typename sRNG,typename pRNG>
 
   long blocks = 1;
   sites = (long)grid->_isites * (long)grid->_osites;
+  prng.isites = (long)grid->_isites;
   
   for (long j=0;j<nd;j++) {
 
@@ -64,7 +64,7 @@ template<typename sRNG,typename pRNG>
   // now we know how many prng's we need ; create hash lookup table
   prng.hash.resize(blocks);
   prng.rng.resize(blocks);
-  samples.resize(blocks);
+  prng.site_sample.resize(sites);
   
   thread_for(idx, blocks, {
 
@@ -87,12 +87,9 @@ template<typename sRNG,typename pRNG>
       _seed.push_back(t);
 
       prng.rng[idx] = new PRNG_t(_seed);
-
-      samples[idx].resize(sites / blocks);
-      
     });
 
-  // now create samples
+  // now map lattice sites to samples
   thread_region
     {
       Coordinate lcoor(nd);
@@ -122,7 +119,7 @@ template<typename sRNG,typename pRNG>
 	  Lexicographic::IndexFromCoor(bcoor,block_index,block_dim);
 	  Lexicographic::IndexFromCoor(rcoor,reduced_index,reduced_dim);
 
-	  samples[block_index][reduced_index] = { iidx, oidx };
+	  prng.site_sample[oidx * prng.isites + iidx] = block_index * (sites / blocks) + reduced_index;
 	});
     }
 
@@ -136,7 +133,6 @@ void cgpt_random_sample_lattice(prng_t & prng, dist_t & dist,
 				size_t obj_stride, tensor_t & t,
 				complex_t c) {
 
-  auto & samples = prng.samples;
   auto & rng = prng.rng;
 
   ASSERT(n_virtual == (long)lattices.size());
@@ -161,15 +157,16 @@ void cgpt_random_sample_lattice(prng_t & prng, dist_t & dist,
   for (size_t i=0;i<view.size();i++)
     p[i] = (complex_t*)PyMemoryView_GET_BUFFER(view[i])->buf;
 
+  // write in lattice order such that each thread first touches the pages
+  // it owns in later operations, no copy to optimize memory mapping needed
   //t0 = cgpt_time();
-  thread_for(idx, blocks, {
-      auto & pr = rng[idx];
-      auto & s = samples[idx];
-      for (size_t i=0;i<s.size();i++) {
-	auto ii = s[i].i;
-	auto oo = s[i].o;
+  size_t isites = prng.isites;
+  size_t osites = prng.sites / isites;
+  auto & site_sample = prng.site_sample;
+  thread_for(oo, osites, {
+      for (size_t ii=0;ii<isites;ii++) {
 	size_t lattice_site_index = oo * osite_stride + ii * isite_stride;
-	size_t data_site_index = idx * n_per_block + i*n_per_site;
+	size_t data_site_index = site_sample[oo * isites + ii] * n_per_site;
 	for (size_t j=0;j<n_per_site;j++) {
 	  p[t[j].idx_lat][lattice_site_index + t[j].idx_obj * obj_stride] = data[data_site_index + j];
 	}
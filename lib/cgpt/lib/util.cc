@@ -52,7 +52,10 @@ EXPORT(util_crc32,{
     unsigned char* data = (unsigned char*)buf->buf;
     int64_t len = (int64_t)buf->len;
 
-    uint32_t crc = cgpt_crc32(data,len,(uint32_t)crc32_prev);
+    uint32_t crc;
+    Py_BEGIN_ALLOW_THREADS;
+    crc = cgpt_crc32(data,len,(uint32_t)crc32_prev);
+    Py_END_ALLOW_THREADS;
     
     return PyLong_FromLong(crc);
   });
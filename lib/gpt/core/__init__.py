@@ -20,7 +20,12 @@
 from gpt.core.grid import grid, grid_from_description, full, redblack
 from gpt.core.precision import single, double, precision, str_to_precision
 from gpt.core.expr import expr, factor, expr_unary, factor_unary, expr_eval
-from gpt.core.lattice import lattice, get_mem_book
+from gpt.core.lattice import (
+    lattice,
+    get_mem_book,
+    get_lattice_pool,
+    get_copy_plan_cache,
+)
 from gpt.core.peekpoke import map_key
 from gpt.core.tensor import tensor
 from gpt.core.gamma import gamma, gamma_base
@@ -29,9 +34,10 @@ from gpt.core.log import message
 from gpt.core.pin import pin
 from gpt.core.stack import get_call_stack
 from gpt.core.convert import convert
-from gpt.core.cshift_plan import cshift_plan
+from gpt.core.cshift_plan import cshift_plan, cshift_batch
 from gpt.core.transform import (
     cshift,
+    eval_scope,
     copy,
     norm2,
     inner_product,
@@ -59,6 +65,7 @@ from gpt.core.mpi import *
 from gpt.core.io import (
     load,
     crc32,
+    crc32_combine,
     save,
     format,
     mview,
@@ -83,6 +90,9 @@ from gpt.core.coordinates import (
     fft,
     coordinate_mask,
     local_coordinates,
+    coordinate_runs,
+    local_coordinate_runs,
+    is_local_coordinates,
 )
 from gpt.core.random import random, sha256
 from gpt.core.mem import mem_info, mem_report, accelerator, host
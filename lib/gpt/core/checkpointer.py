@@ -19,8 +19,26 @@
 import gpt
 import os
 import struct
+import hashlib
+import weakref
+import atexit
+import collections
+import zlib
 import numpy
 
+# high bit of the size field marks a record stored in blocks
+block_record = 1 << 63
+no_base = (1 << 64) - 1
+
+# background writes are daemon threads, drain them before the interpreter exits
+active = weakref.WeakSet()
+
+
+@atexit.register
+def close_all():
+    for c in list(active):
+        c.close()
+
 
 class checkpointer_none:
     def __init__(self):
@@ -34,7 +52,47 @@ class checkpointer_none:
 
 
 class checkpointer:
-    def __init__(self, root):
+    #
+    # Each rank writes its records sequentially to its own file as
+    #
+    #   size (8 bytes), crc32 of data (4 bytes), data
+    #
+    # With incremental=True data is split in blocks and only the blocks that
+    # changed with respect to the last record in the same slot are written,
+    # the others are taken from that record on load.  The slot of a record is
+    # its position in the sequence of records of a single save or load call,
+    # i.e., save([U, alpha]) diffs U[mu] against U[mu] of the last save([U,
+    # alpha]) or of the last load that read it back on resume.  The base may
+    # also be a plain record, e.g., when resuming with incremental=True from
+    # a checkpoint written without it.  After max_chain such records a full
+    # record is written again to bound the work on load.
+    # With compress=True blocks are compressed with zlib.  These records set
+    # the high bit of size and store
+    #
+    #   size, crc32 of data, base offset (8 bytes), block size (8 bytes),
+    #   number of stored blocks (8 bytes), compressed (1 byte), and for each
+    #   stored block its index (8 bytes), length (8 bytes), and data
+    #
+    # The crc32 always refers to the full data such that read_view verifies
+    # the result independent of how it was stored.
+    #
+    # Data is flushed by a background thread, reads wait for pending flushes.
+    # With staging_buffers > 0, save copies the data to a staging buffer and
+    # returns while crc32 and writes are performed by the background thread
+    # (write-behind).  Once staging_buffers writes are pending, save waits
+    # for the oldest one to complete before it stages the next one, such
+    # that at most staging_buffers staging buffers exist.  Pending writes
+    # are completed by close(), which is also called at interpreter exit.
+    #
+    def __init__(
+        self,
+        root,
+        incremental=False,
+        compress=False,
+        block_size=1024 ** 2,
+        max_chain=16,
+        staging_buffers=0,
+    ):
         self.root = root
         self.grid = None
         directory = "%s/%2.2d" % (root, gpt.rank() // 32)
@@ -46,67 +104,276 @@ class checkpointer:
             self.f = gpt.FILE(self.filename, "w+b")
         self.f.seek(0, 1)
         self.verbose = gpt.default.is_verbose("checkpointer")
+        self.incremental = incremental
+        self.compress = compress
+        self.block_size = block_size
+        self.max_chain = max_chain
+        # slot -> (offset, size, block digests, chain length) of last record
+        self.last = {}
+        self.slot = 0
+        self.staging_buffers = staging_buffers
+        self.staging = []
+        self.in_flight = collections.deque()
+        self.writer = None
+        self.pending = None
+        self.dt = {"stage": 0.0, "wait": 0.0, "write": 0.0, "GB": 0.0}
+        active.add(self)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        # completes pending writes and stops the background thread
+        if self.writer is not None:
+            self.wait()
+            self.writer.wait()
+            self.writer = None
+            self.f.flush()
+        active.discard(self)
+
+    def submit(self, f):
+        if self.writer is None:
+            self.writer = gpt.core.io.pipeline.pipeline(max(1, self.staging_buffers))
+        t0 = gpt.time()
+        self.pending = self.writer.submit(f)
+        self.dt["wait"] += gpt.time() - t0
+
+    def wait(self):
+        if self.pending is not None:
+            t0 = gpt.time()
+            self.pending.result()
+            self.pending = None
+            self.in_flight.clear()
+            self.dt["wait"] += gpt.time() - t0
+            if self.verbose and self.dt["GB"] > 0.0:
+                gpt.message(
+                    "Checkpoint %g GB written on head node in background in %g s, %g s hidden (%g s for staging)"
+                    % (
+                        self.dt["GB"],
+                        self.dt["write"],
+                        max(self.dt["write"] - self.dt["wait"], 0.0),
+                        self.dt["stage"],
+                    )
+                )
+            for k in self.dt:
+                self.dt[k] = 0.0
+
+    def digests(self, obj):
+        return [
+            hashlib.blake2b(obj[i : i + self.block_size], digest_size=16).digest()
+            for i in range(0, len(obj), self.block_size)
+        ]
+
+    def next_slot(self):
+        slot = self.slot
+        self.slot += 1
+        return slot
+
+    def remember(self, slot, pos, obj, chain):
+        if self.incremental:
+            self.last[slot] = (pos, len(obj), self.digests(obj), chain)
+
+    def forget(self, pos):
+        # records at or beyond pos will be overwritten
+        self.last = {slot: v for slot, v in self.last.items() if v[0] < pos}
+
+    def stage(self, obj):
+        # wait for a free slot before a buffer is allocated
+        while len(self.in_flight) >= self.staging_buffers:
+            t0 = gpt.time()
+            self.in_flight.popleft().result()
+            self.dt["wait"] += gpt.time() - t0
+
+        # staging buffers of completed writes are re-used, if none fits
+        # one is released before a new one is allocated
+        sz = len(obj)
+        buf = None
+        for i, b in enumerate(self.staging):
+            if len(b) == sz:
+                buf = self.staging.pop(i)
+                break
+        if buf is None:
+            if len(self.staging) + len(self.in_flight) >= self.staging_buffers:
+                self.staging.pop(0)
+            buf = memoryview(bytearray(sz))
+        buf[:] = obj
+        return buf
+
+    def write_behind(self, slot, buf):
+        t0 = gpt.time()
+        szGB, wGB, dt_crc, dt_write = self.write_record(slot, buf)
+        self.f.flush()
+        self.dt["write"] += gpt.time() - t0
+        self.dt["GB"] += szGB
+        if len(self.staging) < self.staging_buffers:
+            self.staging.append(buf)
 
     def save(self, obj):
+        self.slot = 0
+        self.save_object(obj)
+
+    def save_object(self, obj):
         if type(obj) == list:
             for o in obj:
-                self.save(o)
+                self.save_object(o)
         elif type(obj) == gpt.lattice:
-            self.save(obj.mview())
+            self.save_object(obj.mview())
         elif type(obj) == float:
-            self.save(memoryview(struct.pack("d", obj)))
+            self.save_object(memoryview(struct.pack("d", obj)))
         elif type(obj) == complex:
-            self.save(memoryview(struct.pack("dd", obj.real, obj.imag)))
+            self.save_object(memoryview(struct.pack("dd", obj.real, obj.imag)))
         elif type(obj) == memoryview:
-            self.f.seek(0, 1)
-            sz = len(obj)
-            szGB = sz / 1024.0 ** 3
-            self.f.write(sz.to_bytes(8, "little"))
-            t0 = gpt.time()
-            self.f.write(gpt.crc32(obj).to_bytes(4, "little"))
-            t1 = gpt.time()
-            self.f.write(obj)
-            self.f.flush()
-            t2 = gpt.time()
+            slot = self.next_slot()
+            if self.staging_buffers > 0:
+                t0 = gpt.time()
+                buf = self.stage(obj)
+                self.dt["stage"] += gpt.time() - t0
+                # no reference to self from the task, such that __del__ waits
+                # for pending writes
+                proxy = weakref.proxy(self)
+                self.submit(lambda: proxy.write_behind(slot, buf))
+                self.in_flight.append(self.pending)
+                return
+
+            szGB, wGB, dt_crc, dt_write = self.write_record(slot, obj)
+            self.submit(self.f.flush)
             if self.verbose:
                 if self.grid is None:
                     gpt.message(
-                        "Checkpoint %g GB on head node at %g GB/s for crc32 and %g GB/s for write in %g s total"
-                        % (szGB, szGB / (t1 - t0), szGB / (t2 - t1), t2 - t0)
+                        "Checkpoint %g GB on head node (%g GB written) at %g GB/s for crc32 and %g GB/s for write in %g s total"
+                        % (szGB, wGB, szGB / dt_crc, szGB / dt_write, dt_crc + dt_write)
                     )
                 else:
                     szGB = self.grid.globalsum(szGB)
+                    wGB = self.grid.globalsum(wGB)
                     gpt.message(
-                        "Checkpoint %g GB at %g GB/s for crc32 and %g GB/s for write in %g s total"
-                        % (szGB, szGB / (t1 - t0), szGB / (t2 - t1), t2 - t0)
+                        "Checkpoint %g GB (%g GB written) at %g GB/s for crc32 and %g GB/s for write in %g s total"
+                        % (szGB, wGB, szGB / dt_crc, szGB / dt_write, dt_crc + dt_write)
                     )
         else:
             assert 0
 
+    def write_record(self, slot, obj):
+        self.f.seek(0, 1)
+        pos = self.f.tell()
+        sz = len(obj)
+        szGB = sz / 1024.0 ** 3
+        t0 = gpt.time()
+        crc32 = gpt.crc32(obj)
+        t1 = gpt.time()
+        if self.incremental or self.compress:
+            wGB = self.write_blocks(slot, pos, obj, crc32) / 1024.0 ** 3
+        else:
+            self.f.write(sz.to_bytes(8, "little"))
+            self.f.write(crc32.to_bytes(4, "little"))
+            self.f.write(obj)
+            wGB = szGB
+        t2 = gpt.time()
+        return szGB, wGB, t1 - t0, t2 - t1
+
+    def write_blocks(self, slot, pos, obj, crc32):
+        sz = len(obj)
+        digests = self.digests(obj) if self.incremental else None
+
+        # blocks that changed with respect to last record in this slot
+        base = no_base
+        chain = 0
+        blocks = list(range(len(digests) if digests is not None else 1))
+        if digests is None:
+            block_size = sz
+        else:
+            block_size = self.block_size
+            last = self.last.get(slot)
+            if last is not None and last[1] == sz and last[3] < self.max_chain:
+                base, _, last_digests, chain = last
+                chain += 1
+                blocks = [i for i, d in enumerate(digests) if d != last_digests[i]]
+            self.last[slot] = (pos, sz, digests, chain)
+
+        header = (
+            (sz | block_record).to_bytes(8, "little")
+            + crc32.to_bytes(4, "little")
+            + base.to_bytes(8, "little")
+            + block_size.to_bytes(8, "little")
+            + len(blocks).to_bytes(8, "little")
+            + (1 if self.compress else 0).to_bytes(1, "little")
+        )
+        self.f.write(header)
+        written = len(header)
+        for i in blocks:
+            data = obj[i * block_size : (i + 1) * block_size]
+            if self.compress:
+                data = memoryview(zlib.compress(data, 1))
+            self.f.write(i.to_bytes(8, "little") + len(data).to_bytes(8, "little"))
+            self.f.write(data)
+            written += 16 + len(data)
+        return written
+
+    def read_blocks(self, obj, end):
+        # reads block record after size and crc32, returns length of chain
+        base, block_size, nblocks = [
+            int.from_bytes(self.f.read(8), "little") for i in range(3)
+        ]
+        compressed = self.f.read(1)[0] != 0
+        chain = 0
+        if base != no_base:
+            pos = self.f.tell()
+            self.f.seek(base, 0)
+            base_size = int.from_bytes(self.f.read(8), "little")
+            self.f.read(4)
+            if base_size == len(obj) | block_record:
+                chain = self.read_blocks(obj, end) + 1
+            elif base_size == len(obj):
+                # plain record, e.g., written before incremental mode was used
+                if self.f.tell() + len(obj) > end:
+                    raise ValueError("Truncated record")
+                obj[:] = self.f.read(len(obj))
+                chain = 1
+            else:
+                raise ValueError("Base record has different size")
+            self.f.seek(pos, 0)
+        for j in range(nblocks):
+            i, sz = [int.from_bytes(self.f.read(8), "little") for k in range(2)]
+            if self.f.tell() + sz > end:
+                raise ValueError("Truncated record")
+            data = self.f.read(sz)
+            if compressed:
+                data = zlib.decompress(data)
+            if i * block_size + len(data) > len(obj):
+                raise ValueError("Block out of range")
+            obj[i * block_size : i * block_size + len(data)] = data
+        return chain
+
     def load(self, obj):
+        self.wait()
+        self.slot = 0
+        return self.load_object(obj)
+
+    def load_object(self, obj):
         if type(obj) == list:
             if len(obj) != 1:
                 allok = True
                 pos = self.f.tell()
                 for i, o in enumerate(obj):
                     r = [o]
-                    allok = allok and self.load(r)
+                    allok = allok and self.load_object(r)
                     obj[i] = r[0]
                 if not allok:
                     self.f.seek(
                         pos, 0
                     )  # reset position to overwrite corrupted data chunk
+                    self.forget(pos)
                 return allok
             else:
                 if type(obj[0]) == gpt.lattice:
-                    res = self.load(obj[0].mview())
+                    res = self.load_object(obj[0].mview())
                 elif type(obj[0]) == float:
                     v = memoryview(bytearray(8))
-                    res = self.load(v)
+                    res = self.load_object(v)
                     obj[0] = struct.unpack("d", v)[0]
                 elif type(obj[0]) == complex:
                     v = memoryview(bytearray(16))
-                    res = self.load(v)
+                    res = self.load_object(v)
                     obj[0] = complex(*struct.unpack("dd", v)[0, 1])
                 elif type(obj[0]) == memoryview:
                     return self.read_view(obj[0])
@@ -116,29 +383,42 @@ class checkpointer:
         elif type(obj) == memoryview:
             return self.read_view(obj)
         elif type(obj) == gpt.lattice:
-            return self.load(obj.mview())
+            return self.load_object(obj.mview())
         else:
             assert 0
 
     def read_view(self, obj):
+        self.wait()
+        slot = self.next_slot()
         pos = self.f.tell()
         self.f.seek(0, 2)
+        end = self.f.tell()
         flags = numpy.array([0.0, 1.0, 0.0], dtype=numpy.float64)
         t0 = gpt.time()
-        if self.f.tell() != pos:
+        if end >= pos + 12:
             self.f.seek(pos, 0)
             # try to read
             sz = int.from_bytes(self.f.read(8), "little")
+            blocks = (sz & block_record) != 0
+            sz &= ~block_record
             szGB = sz / 1024.0 ** 3
             flags[2] = szGB
             crc32_expected = int.from_bytes(self.f.read(4), "little")
             if len(obj) == sz:
-                data = self.f.read(sz)
-                if len(data) == sz:
-                    obj[:] = data
+                chain = 0
+                try:
+                    if blocks:
+                        chain = self.read_blocks(obj, end)
+                    elif pos + 12 + sz <= end:
+                        obj[:] = self.f.read(sz)
+                    else:
+                        raise ValueError("Truncated record")
                     crc32 = gpt.crc32(obj)
                     if crc32 == crc32_expected:
                         flags[0] = 1.0  # flag success on this node
+                        self.remember(slot, pos, obj, chain)
+                except (AssertionError, ValueError, IndexError, zlib.error):
+                    pass
 
         # compare global
         assert self.grid is not None
@@ -164,5 +444,6 @@ class checkpointer:
 
         # reset position to overwrite corruption
         self.f.seek(pos, 0)
+        self.forget(pos)
 
         return False
@@ -17,28 +17,197 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
-import gpt, cgpt, numpy
+import gpt, cgpt, numpy, collections
 
 
 class local_coordinates(numpy.ndarray):
     pass
 
 
+class coordinate_runs:
+    #
+    # Compact representation of a list of coordinates as runs of
+    # (start, count, stride) of the global lexicographic index (first
+    # dimension running fastest).  Copy plans consume this representation
+    # directly such that the coordinates are never expanded in python.
+    # This saves the coordinate arrays only, the copy plan itself still
+    # holds one block per site.
+    #
+    def __init__(self, runs, fdimensions, local=False):
+        self.runs = runs
+        self.runs.flags.writeable = False
+        self.fdimensions = list(fdimensions)
+        self.local = local
+        self.n = int(numpy.sum(runs[:, 1]))
+
+    def __len__(self):
+        return self.n
+
+    @staticmethod
+    def from_linear(index, fdimensions, local=False):
+        n = len(index)
+        if n == 0:
+            return coordinate_runs(numpy.zeros((0, 3), dtype=numpy.int64), fdimensions)
+
+        # split where the difference of consecutive indices changes, an
+        # element between two such segments is added to the left run
+        d = numpy.diff(index)
+        seg = numpy.concatenate(([0], numpy.flatnonzero(d[1:] != d[:-1]) + 1))
+        end = numpy.concatenate((seg[1:], [n - 1]))
+        first = numpy.concatenate(([0], seg[1:] + 1))
+        count = end - first + 1
+        stride = d[seg] if n > 1 else numpy.ones((1,), dtype=numpy.int64)
+        return coordinate_runs.merge(
+            numpy.stack((index[first], count, stride), axis=1).astype(numpy.int64),
+            fdimensions,
+            local,
+        )
+
+    @staticmethod
+    def merge(runs, fdimensions, local=False):
+        # single elements take the stride of the following run, then
+        # consecutive runs that continue each other are joined
+        if len(runs) > 1:
+            single = numpy.flatnonzero(runs[:-1, 1] == 1)
+            runs[single, 2] = runs[single + 1, 2]
+            cont = (runs[1:, 2] == runs[:-1, 2]) & (
+                runs[1:, 0] == runs[:-1, 0] + runs[:-1, 1] * runs[:-1, 2]
+            )
+            group = numpy.cumsum(numpy.concatenate(([True], ~cont))) - 1
+            first = numpy.flatnonzero(numpy.concatenate(([True], ~cont)))
+            runs = numpy.stack(
+                (
+                    runs[first, 0],
+                    numpy.bincount(group, weights=runs[:, 1]).astype(numpy.int64),
+                    runs[first, 2],
+                ),
+                axis=1,
+            )
+        return coordinate_runs(numpy.ascontiguousarray(runs), fdimensions, local)
+
+    @staticmethod
+    def from_coordinates(pos, fdimensions, local=False):
+        index = numpy.zeros((len(pos),), dtype=numpy.int64)
+        stride = 1
+        for mu in range(len(fdimensions)):
+            index += pos[:, mu].astype(numpy.int64) * stride
+            stride *= fdimensions[mu]
+        return coordinate_runs.from_linear(index, fdimensions, local)
+
+    @staticmethod
+    def from_cartesian_view(top, bottom, checker_dim_mask, cb, fdimensions, local):
+        # one run per row along the first dimension, in the order of
+        # cgpt.coordinates_from_cartesian_view(..., "lexicographic")
+        nd = len(top)
+        size = [bottom[i] - top[i] for i in range(nd)]
+        if any([x == 0 for x in size]):
+            return coordinate_runs(numpy.zeros((0, 3), dtype=numpy.int64), fdimensions)
+
+        if nd > 1:
+            rows = numpy.meshgrid(
+                *[numpy.arange(top[i], bottom[i]) for i in range(1, nd)], indexing="ij"
+            )
+            rows = numpy.stack([r.reshape(-1, order="F") for r in rows], axis=1)
+        else:
+            rows = numpy.zeros((1, 0), dtype=numpy.int64)
+        start = numpy.full((len(rows),), top[0], dtype=numpy.int64)
+        count = numpy.full((len(rows),), size[0], dtype=numpy.int64)
+        stride = numpy.ones((len(rows),), dtype=numpy.int64)
+        if cb is not None:
+            parity = numpy.sum(rows[:, numpy.array(checker_dim_mask[1:]) != 0], axis=1)
+            if checker_dim_mask[0]:
+                shift = (parity + top[0] + cb) % 2
+                start += shift
+                count = (size[0] - shift + 1) // 2
+                stride *= 2
+            else:
+                count[(parity + cb) % 2 != 0] = 0
+
+        index = start
+        s = fdimensions[0]
+        for i in range(1, nd):
+            index = index + rows[:, i - 1].astype(numpy.int64) * s
+            s *= fdimensions[i]
+
+        runs = numpy.stack((index, count, stride), axis=1)
+        return coordinate_runs.merge(runs[count > 0], fdimensions, local)
+
+    def expand(self):
+        count = self.runs[:, 1]
+        offset = numpy.arange(self.n) - numpy.repeat(numpy.cumsum(count) - count, count)
+        index = numpy.repeat(self.runs[:, 0], count) + offset * numpy.repeat(
+            self.runs[:, 2], count
+        )
+        pos = numpy.stack(
+            numpy.unravel_index(index, self.fdimensions, order="F"), axis=1
+        ).astype(numpy.int32)
+        if self.local:
+            pos = pos.view(local_coordinates)
+        pos.flags.writeable = False
+        return pos
+
+
+def is_local_coordinates(pos):
+    return isinstance(pos, local_coordinates) or (
+        isinstance(pos, coordinate_runs) and pos.local
+    )
+
+
+# cached read-only coordinates of local volume
+cache = collections.OrderedDict()  # least recently used first
+cache_size = 8
+
+
+def local_box(grid):
+    dim = len(grid.ldimensions)
+    cbf = [grid.fdimensions[i] // grid.gdimensions[i] for i in range(dim)]
+    top = [grid.processor_coor[i] * grid.ldimensions[i] * cbf[i] for i in range(dim)]
+    bottom = [top[i] + grid.ldimensions[i] * cbf[i] for i in range(dim)]
+    return top, bottom
+
+
+def cached(key, grid, f):
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key][1]
+    # keep a reference to grid such that key stays unique
+    cache[key] = (grid, f())
+    while len(cache) > cache_size:
+        cache.popitem(last=False)
+    return cache[key][1]
+
+
+def local_coordinate_runs(grid, cb):
+    def create():
+        top, bottom = local_box(grid)
+        return coordinate_runs.from_cartesian_view(
+            top,
+            bottom,
+            grid.cb.cb_mask,
+            cb.tag,
+            grid.fdimensions,
+            True,
+        )
+
+    return cached((grid.obj, cb.__name__, "runs"), grid, create)
+
+
 def coordinates(o, order="lexicographic"):
     if type(o) == gpt.grid and o.cb.n == 1:
         return coordinates((o, gpt.none), order=order)
     elif type(o) == tuple and type(o[0]) == gpt.grid and len(o) == 2:
-        dim = len(o[0].ldimensions)
-        cb = o[1].tag
-        checker_dim_mask = o[0].cb.cb_mask
-        cbf = [o[0].fdimensions[i] // o[0].gdimensions[i] for i in range(dim)]
-        top = [
-            o[0].processor_coor[i] * o[0].ldimensions[i] * cbf[i] for i in range(dim)
-        ]
-        bottom = [top[i] + o[0].ldimensions[i] * cbf[i] for i in range(dim)]
-        return cgpt.coordinates_from_cartesian_view(
-            top, bottom, checker_dim_mask, cb, order
-        ).view(local_coordinates)
+        grid, cb = o
+
+        def create():
+            top, bottom = local_box(grid)
+            pos = cgpt.coordinates_from_cartesian_view(
+                top, bottom, grid.cb.cb_mask, cb.tag, order
+            ).view(local_coordinates)
+            # shared by all callers
+            pos.flags.writeable = False
+            return pos
+
+        return cached((grid.obj, cb.__name__, order), grid, create)
     elif type(o) == gpt.lattice:
         return coordinates((o.grid, o.checkerboard()), order=order)
     elif type(o) == gpt.cartesian_view:
@@ -153,7 +153,12 @@ class lattice_view:
 
     def view(self, layout):
         v_obj = [y for x in self.l for y in x.v_obj]
-        obj = cgpt.copy_create_view_from_lattice(v_obj, self.pos, self.tidx)
+        if isinstance(self.pos, gpt.coordinate_runs):
+            obj = cgpt.copy_create_view_from_lattice_runs(
+                v_obj, self.pos.runs, self.tidx
+            )
+        else:
+            obj = cgpt.copy_create_view_from_lattice(v_obj, self.pos, self.tidx)
 
         # assume l are consecutive in layout, this is not checked at the moment!
         cgpt.copy_view_add_index_offset(obj, layout.get_index(self.l[0]))
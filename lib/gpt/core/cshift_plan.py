@@ -26,10 +26,15 @@ class cshift_executer:
         self.buffer_descriptions = buffer_descriptions
         self.plan = plan
 
-    def __call__(self, fields):
+    def allocate(self):
         buffers = [g.lattice(b[0], b[1]) for b in self.buffer_descriptions]
         for i in range(len(self.buffer_descriptions)):
             buffers[i].checkerboard(self.buffer_descriptions[i][2])
+        return buffers
+
+    def __call__(self, fields, buffers=None):
+        if buffers is None:
+            buffers = self.allocate()
         self.plan(buffers, fields)
         return buffers
 
@@ -66,3 +71,25 @@ class cshift_plan:
                 plan.destination += self.destinations[self.indices[i][x]].view[:]
                 plan.source += src.view[cgpt.coordinates_shift(coordinates, x, L)]
         return cshift_executer(buffer_descriptions, plan())
+
+
+class cshift_batch:
+    #
+    # batch = g.cshift_batch([U[0], U[1]], [[(1, 0, 0, 0)], [(0, 1, 0, 0), (1, 0, 0, 0)]])
+    # batch([U[0], U[1]])
+    # batch[1, (1, 0, 0, 0)]  # U[1](x + 0)
+    #
+    # All shifted fields are moved by a single copy plan and the output buffers
+    # are allocated only once and overwritten by each call.
+    #
+    def __init__(self, fields, displacements):
+        plan = cshift_plan()
+        self.indices = [plan.add(f, d) for f, d in zip(fields, displacements)]
+        self.buffers = plan.destinations
+        self.executer = plan()
+
+    def __call__(self, fields):
+        return self.executer(fields, self.buffers)
+
+    def __getitem__(self, key):
+        return self.buffers[self.indices[key[0]][tuple(key[1])]]
@@ -16,7 +16,7 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
-import cgpt, gpt
+import cgpt, gpt, mmap, os
 
 # , os, shutil, sys
 
@@ -40,8 +40,30 @@ import cgpt, gpt
 
 
 class FILE:
-    def __init__(self, fn, md):
+    #
+    # FILE(fn, "rb", memory_map=True) maps the file into memory such that read
+    # returns memoryviews directly over the page cache instead of copies.  The
+    # mapping is private, i.e., the views are writable but changes are not
+    # written back to the file.
+    #
+    def __init__(self, fn, md, memory_map=False):
         # fn = cache_file(fn,md)
+        self.memory_map = memory_map
+        if memory_map:
+            assert md == "rb"
+            if not os.path.isfile(fn):
+                raise FileNotFoundError("Can not open file %s" % fn)
+            with open(fn, "rb") as f:
+                if os.fstat(f.fileno()).st_size > 0:
+                    self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                    self.view = memoryview(self.mm)
+                else:
+                    self.mm = None
+                    self.view = memoryview(bytearray())
+            self.position = 0
+            self.f = None
+            return
+
         self.f = cgpt.fopen(fn, md)
         if self.f == 0:
             self.f = None
@@ -52,27 +74,60 @@ class FILE:
             cgpt.fclose(self.f)
 
     def close(self):
+        if self.memory_map:
+            assert self.view is not None
+            self.view.release()
+            self.view = None
+            if self.mm is not None:
+                try:
+                    self.mm.close()
+                except BufferError:
+                    # views returned by read are still in use, mapping is
+                    # released once they are garbage collected
+                    pass
+                self.mm = None
+            return
         assert self.f is not None
         cgpt.fclose(self.f)
         self.f = None
 
     def tell(self):
+        if self.memory_map:
+            return self.position
         assert self.f is not None
         r = cgpt.ftell(self.f)
         return r
 
     def seek(self, offset, whence):
+        if self.memory_map:
+            self.position = [0, self.position, len(self.view)][whence] + offset
+            return 0
         assert self.f is not None
         r = cgpt.fseek(self.f, offset, whence)
         return r
 
     def read(self, sz):
+        if self.memory_map:
+            assert self.position + sz <= len(self.view)
+            t = self.view[self.position : self.position + sz]
+            self.position += sz
+            return t
         assert self.f is not None
         t = bytes(sz)
         if sz > 0:
             assert cgpt.fread(self.f, sz, memoryview(t)) == 1
         return t
 
+    def readinto(self, mv):
+        sz = len(mv)
+        if self.memory_map:
+            mv[:] = self.read(sz)
+            return sz
+        assert self.f is not None
+        if sz > 0:
+            assert cgpt.fread(self.f, sz, mv) == 1
+        return sz
+
     def write(self, d):
         assert self.f is not None
         if type(d) != memoryview:
@@ -16,12 +16,16 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
+import gpt.core.io.pipeline
+import gpt.core.io.codec
 import gpt.core.io.corr_io
 import gpt.core.io.gpt_io
 import gpt.core.io.cevec_io
 import gpt.core.io.qlat_io
+import gpt.core.io.nersc_io
+import gpt.core.io.openQCD_io
 from gpt.core.io.FILE import FILE
 from gpt.core.io.error import LoadError
-from gpt.core.io.util import mview, crc32
+from gpt.core.io.util import mview, crc32, crc32_combine
 from gpt.core.io.load import load
 from gpt.core.io.save import format, save
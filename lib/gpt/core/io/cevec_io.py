@@ -48,6 +48,35 @@ def get_param(params, a, v):
     return v
 
 
+def group_blocks(params, pos, block_data_size_single, block_data_size_fp16, nbasis):
+    #
+    # Blocks are merged pairwise until there are at most max_read_blocks groups
+    # or a group would hold more than max_read_gb of single-precision data of
+    # all nbasis vectors.  Load and save keep two staging buffers and one or two
+    # conversion buffers of at most this size, so their peak buffer memory per
+    # view is 3 * max_read_gb (or three times the size of a single block if
+    # this is larger).
+    #
+    read_blocks = len(pos)
+    block_reduce = 1
+    max_read_blocks = get_param(params, "max_read_blocks", 8)
+    max_read_bytes = get_param(params, "max_read_gb", 1.0) * 1024 ** 3
+    while (
+        read_blocks > max_read_blocks
+        and read_blocks % 2 == 0
+        and 2 * block_data_size_single * nbasis <= max_read_bytes
+    ):
+        pos = [
+            numpy.concatenate((pos[2 * i + 0], pos[2 * i + 1]))
+            for i in range(read_blocks // 2)
+        ]
+        block_data_size_single *= 2
+        block_data_size_fp16 *= 2
+        read_blocks //= 2
+        block_reduce *= 2
+    return pos, block_data_size_single, block_data_size_fp16, read_blocks, block_reduce
+
+
 def mem_avail():
     return gpt.mem_info()["host_available"] / 1024 ** 3.0
 
@@ -181,14 +210,24 @@ def load(filename, params):
     views = cv0.views_for_node(fgrid)
 
     # timing
-    totalSizeGB = 0
-    dt_fp16 = 1e-30
-    dt_distr = 1e-30
-    dt_munge = 1e-30
-    dt_crc = 1e-30
-    dt_fread = 1e-30
+    dt = {"fp16": 1e-30, "distr": 1e-30, "munge": 1e-30, "crc": 1e-30}
+    dt["fread"] = 1e-30
+    dt["GB"] = 0.0
     t0 = gpt.time()
 
+    def message_progress(with_fp16):
+        totalSizeGB = dt["GB"]
+        msg = "* read %g GB: fread at %g GB/s, crc32 at %g GB/s, munge at %g GB/s, distribute at %g GB/s" % (
+            totalSizeGB,
+            totalSizeGB / dt["fread"],
+            totalSizeGB / dt["crc"],
+            totalSizeGB / dt["munge"],
+            totalSizeGB / dt["distr"],
+        )
+        if with_fp16:
+            msg += ", fp16 at %g GB/s" % (totalSizeGB / dt["fp16"])
+        gpt.message(msg + "; available = %g GB" % mem_avail())
+
     # load all views
     if verbose:
         gpt.message("Loading %s with %d views per node" % (filename, len(views)))
@@ -218,10 +257,11 @@ def load(filename, params):
         coarse_fp32_vector_size = 2 * (4 * nbasis) * blocks
 
         # checksum
-        crc32_comp = 0
+        crc32_comp = {"crc": 0}
 
         # file
-        f = gpt.FILE(fn, "rb") if fn is not None else None
+        memory_map = get_param(params, "mmap", False)
+        f = gpt.FILE(fn, "rb", memory_map=memory_map) if fn is not None else None
 
         # block positions
         pos = [
@@ -230,18 +270,15 @@ def load(filename, params):
         ]
 
         # group blocks
-        read_blocks = blocks
-        block_reduce = 1
-        max_read_blocks = get_param(params, "max_read_blocks", 8)
-        while read_blocks > max_read_blocks and read_blocks % 2 == 0:
-            pos = [
-                numpy.concatenate((pos[2 * i + 0], pos[2 * i + 1]))
-                for i in range(read_blocks // 2)
-            ]
-            block_data_size_single *= 2
-            block_data_size_fp16 *= 2
-            read_blocks //= 2
-            block_reduce *= 2
+        (
+            pos,
+            block_data_size_single,
+            block_data_size_fp16,
+            read_blocks,
+            block_reduce,
+        ) = group_blocks(
+            params, pos, block_data_size_single, block_data_size_fp16, nbasis
+        )
         gpt.message("Read blocks", blocks)
 
         # make read-only to enable caching
@@ -251,35 +288,77 @@ def load(filename, params):
         # dummy buffer
         data0 = memoryview(bytes())
 
-        # single-precision data
-        data_munged = memoryview(bytearray(block_data_size_single * nsingleCap))
-        for b in range(read_blocks):
+        # the file is read in order: single-precision block groups, fp16 block groups,
+        # and coarse vectors; chunk k + 1 is read on a background thread into one of
+        # two staging buffers while chunk k is checksummed, converted, and distributed
+        read_sizes = [block_data_size_single * nsingleCap] * read_blocks
+        if nbasis != nsingleCap:
+            read_sizes += [block_data_size_fp16 * (nbasis - nsingleCap)] * read_blocks
+        read_sizes += [coarse_vector_size] * neigen
+
+        reader = gpt.core.io.pipeline.pipeline(2)
+        checker = gpt.core.io.pipeline.pipeline(2)
+        staging = [memoryview(bytearray()), memoryview(bytearray())]
+        chunks = []
+
+        def read_chunk(k):
+            dt["fread"] -= gpt.time()
+            sz = read_sizes[k]
+            if memory_map:
+                data = f.read(sz)
+            else:
+                if len(staging[k % 2]) < sz:
+                    staging[k % 2] = memoryview(bytearray(sz))
+                data = staging[k % 2][0:sz]
+                f.readinto(data)
+            dt["fread"] += gpt.time()
+            return data
+
+        def check_chunk(data):
+            dt["crc"] -= gpt.time()
+            crc32_comp["crc"] = gpt.crc32(data, crc32_comp["crc"])
+            dt["crc"] += gpt.time()
+
+        def submit_chunk(k):
+            if f is not None and k < len(read_sizes):
+                chunks.append(reader.submit(lambda: read_chunk(k)))
+
+        def next_chunk(k):
             fgrid.barrier()
-            dt_fread -= gpt.time()
             if f is not None:
-                data = memoryview(f.read(block_data_size_single * nsingleCap))
+                data = chunks[k].result()
+                chunks[k] = None
+                submit_chunk(k + 1)
+                check = checker.submit(lambda: check_chunk(data))
                 globalReadGB = len(data) / 1024.0 ** 3.0
             else:
+                data = data0
+                check = None
                 globalReadGB = 0.0
-            globalReadGB = fgrid.globalsum(globalReadGB)
-            dt_fread += gpt.time()
-            totalSizeGB += globalReadGB
+            dt["GB"] += fgrid.globalsum(globalReadGB)
+            return data, check
+
+        submit_chunk(0)
+
+        # single-precision data
+        data_munged = memoryview(bytearray(block_data_size_single * nsingleCap))
+        for b in range(read_blocks):
+            data, check = next_chunk(b)
 
             if f is not None:
-                dt_crc -= gpt.time()
-                crc32_comp = gpt.crc32(data, crc32_comp)
-                dt_crc += gpt.time()
-                dt_munge -= gpt.time()
+                dt["munge"] -= gpt.time()
                 # data: lattice0_posA lattice1_posA .... lattice0_posB lattice1_posB
                 cgpt.munge_inner_outer(data_munged, data, nsingleCap, block_reduce)
                 # data_munged: lattice0 lattice1 lattice2 ...
-                dt_munge += gpt.time()
+                dt["munge"] += gpt.time()
+                check.result()
+                data_dist = data_munged
             else:
-                data_munged = data0
+                data_dist = data0
 
             fgrid.barrier()
-            dt_distr -= gpt.time()
-            rhs = data_munged[0:block_data_size_single]
+            dt["distr"] -= gpt.time()
+            rhs = data_dist[0:block_data_size_single]
             distribute_plan = gpt.copy_plan(basis[0], rhs)
             distribute_plan.destination += basis[0].view[pos[b]]
             distribute_plan.source += gpt.global_memory_view(
@@ -290,24 +369,14 @@ def load(filename, params):
             for i in range(nsingleCap_max):
                 distribute_plan(
                     basis[i],
-                    data_munged[
+                    data_dist[
                         block_data_size_single * i : block_data_size_single * (i + 1)
                     ],
                 )
-            dt_distr += gpt.time()
+            dt["distr"] += gpt.time()
 
             if verbose:
-                gpt.message(
-                    "* read %g GB: fread at %g GB/s, crc32 at %g GB/s, munge at %g GB/s, distribute at %g GB/s; available = %g GB"
-                    % (
-                        totalSizeGB,
-                        totalSizeGB / dt_fread,
-                        totalSizeGB / dt_crc,
-                        totalSizeGB / dt_munge,
-                        totalSizeGB / dt_distr,
-                        mem_avail(),
-                    )
-                )
+                message_progress(False)
 
         # fp16 data
         if nbasis != nsingleCap:
@@ -319,41 +388,29 @@ def load(filename, params):
                 bytearray(block_data_size_single * (nbasis - nsingleCap))
             )
             for b in range(read_blocks):
-                fgrid.barrier()
-                dt_fread -= gpt.time()
-                if f is not None:
-                    data = memoryview(
-                        f.read(block_data_size_fp16 * (nbasis - nsingleCap))
-                    )
-                    globalReadGB = len(data) / 1024.0 ** 3.0
-                else:
-                    globalReadGB = 0.0
-                globalReadGB = fgrid.globalsum(globalReadGB)
-                dt_fread += gpt.time()
-                totalSizeGB += globalReadGB
+                data, check = next_chunk(read_blocks + b)
 
                 if f is not None:
-                    dt_crc -= gpt.time()
-                    crc32_comp = gpt.crc32(data, crc32_comp)
-                    dt_crc += gpt.time()
-                    dt_fp16 -= gpt.time()
+                    dt["fp16"] -= gpt.time()
                     cgpt.fp16_to_fp32(data_fp32, data, 24)
-                    dt_fp16 += gpt.time()
-                    dt_munge -= gpt.time()
+                    dt["fp16"] += gpt.time()
+                    dt["munge"] -= gpt.time()
                     cgpt.munge_inner_outer(
                         data_munged,
                         data_fp32,
                         nbasis - nsingleCap,
                         block_reduce,
                     )
-                    dt_munge += gpt.time()
+                    dt["munge"] += gpt.time()
+                    check.result()
+                    data_dist = data_munged
                 else:
-                    data_munged = data0
+                    data_dist = data0
 
                 fgrid.barrier()
-                dt_distr -= gpt.time()
+                dt["distr"] -= gpt.time()
                 if nsingleCap < nbasis_max:
-                    rhs = data_munged[0:block_data_size_single]
+                    rhs = data_dist[0:block_data_size_single]
                     distribute_plan = gpt.copy_plan(basis[0], rhs)
                     distribute_plan.destination += basis[0].view[pos[b]]
                     distribute_plan.source += gpt.global_memory_view(
@@ -365,48 +422,25 @@ def load(filename, params):
                         j = i - nsingleCap
                         distribute_plan(
                             basis[i],
-                            data_munged[
+                            data_dist[
                                 block_data_size_single
                                 * j : block_data_size_single
                                 * (j + 1)
                             ],
                         )
-                dt_distr += gpt.time()
+                dt["distr"] += gpt.time()
 
                 if verbose:
-                    gpt.message(
-                        "* read %g GB: fread at %g GB/s, crc32 at %g GB/s, munge at %g GB/s, distribute at %g GB/s, fp16 at %g GB/s; available = %g GB"
-                        % (
-                            totalSizeGB,
-                            totalSizeGB / dt_fread,
-                            totalSizeGB / dt_crc,
-                            totalSizeGB / dt_munge,
-                            totalSizeGB / dt_distr,
-                            totalSizeGB / dt_fp16,
-                            mem_avail(),
-                        )
-                    )
+                    message_progress(True)
 
         # coarse grid data
         data_fp32 = memoryview(bytearray(coarse_fp32_vector_size))
         distribute_plan = None
         for j in range(neigen):
-            fgrid.barrier()
-            dt_fread -= gpt.time()
-            if f is not None:
-                data = memoryview(f.read(coarse_vector_size))
-                globalReadGB = len(data) / 1024.0 ** 3.0
-            else:
-                globalReadGB = 0.0
-            globalReadGB = fgrid.globalsum(globalReadGB)
-            dt_fread += gpt.time()
-            totalSizeGB += globalReadGB
+            data, check = next_chunk(len(read_sizes) - neigen + j)
 
             if f is not None:
-                dt_crc -= gpt.time()
-                crc32_comp = gpt.crc32(data, crc32_comp)
-                dt_crc += gpt.time()
-                dt_fp16 -= gpt.time()
+                dt["fp16"] -= gpt.time()
                 cgpt.mixed_fp32fp16_to_fp32(
                     data_fp32,
                     data,
@@ -414,13 +448,12 @@ def load(filename, params):
                     coarse_block_size_part_fp16,
                     FP16_COEF_EXP_SHARE_FLOATS,
                 )
-                dt_fp16 += gpt.time()
+                dt["fp16"] += gpt.time()
+                check.result()
                 data = data_fp32
-            else:
-                data = data0
 
             fgrid.barrier()
-            dt_distr -= gpt.time()
+            dt["distr"] -= gpt.time()
             if j < neigen_max:
                 if distribute_plan is None:
                     distribute_plan = gpt.copy_plan(cevec[j], data)
@@ -430,32 +463,25 @@ def load(filename, params):
                     )
                     distribute_plan = distribute_plan()
                 distribute_plan(cevec[j], data)
-            dt_distr += gpt.time()
+            dt["distr"] += gpt.time()
 
             if verbose and j % (neigen // 10) == 0:
-                gpt.message(
-                    "* read %g GB: fread at %g GB/s, crc32 at %g GB/s, munge at %g GB/s, distribute at %g GB/s, fp16 at %g GB/s; available = %g GB"
-                    % (
-                        totalSizeGB,
-                        totalSizeGB / dt_fread,
-                        totalSizeGB / dt_crc,
-                        totalSizeGB / dt_munge,
-                        totalSizeGB / dt_distr,
-                        totalSizeGB / dt_fp16,
-                        mem_avail(),
-                    )
-                )
+                message_progress(True)
+
+        # propagate errors of background threads
+        reader.wait()
+        checker.wait()
 
         # crc checks
         if f is not None:
-            assert crc32_comp == crc32[cv.rank]
+            assert crc32_comp["crc"] == crc32[cv.rank]
 
     # timing
     t1 = gpt.time()
 
     # verbosity
     if verbose:
-        gpt.message("* load %g GB at %g GB/s" % (totalSizeGB, totalSizeGB / (t1 - t0)))
+        gpt.message("* load %g GB at %g GB/s" % (dt["GB"], dt["GB"] / (t1 - t0)))
 
     # eigenvalues
     evln = list(
@@ -560,15 +586,24 @@ def save(filename, objs, params):
     views = cv0.views_for_node(fgrid)
     crc32 = numpy.array([0] * cv0.ranks, dtype=numpy.uint64)
     # timing
-    t0 = gpt.time()
-    totalSizeGB = 0
-    dt_fp16 = 1e-30
-    dt_distr = 1e-30
-    dt_munge = 1e-30
-    dt_crc = 1e-30
-    dt_fwrite = 1e-30
+    dt = {"fp16": 1e-30, "distr": 1e-30, "munge": 1e-30, "crc": 1e-30}
+    dt["fwrite"] = 1e-30
+    dt["GB"] = 0.0
     t0 = gpt.time()
 
+    def message_progress(with_fp16):
+        totalSizeGB = dt["GB"]
+        msg = "* write %g GB: fwrite at %g GB/s, crc32 at %g GB/s, munge at %g GB/s, distribute at %g GB/s" % (
+            totalSizeGB,
+            totalSizeGB / dt["fwrite"],
+            totalSizeGB / dt["crc"],
+            totalSizeGB / dt["munge"],
+            totalSizeGB / dt["distr"],
+        )
+        if with_fp16:
+            msg += ", fp16 at %g GB/s" % (totalSizeGB / dt["fp16"])
+        gpt.message(msg)
+
     # load all views
     if verbose:
         gpt.message("Saving %s with %d views per node" % (filename, len(views)))
@@ -598,18 +633,9 @@ def save(filename, objs, params):
         coarse_vector_size = (
             coarse_block_size_part_fp32 + coarse_block_size_part_fp16
         ) * blocks
-        totalSize = (
-            blocks
-            * (
-                block_data_size_single * nsingleCap
-                + block_data_size_fp16 * (nbasis - nsingleCap)
-            )
-            + neigen * coarse_vector_size
-        )
-        totalSizeGB += totalSize / 1024.0 ** 3.0 if v is not None else 0.0
 
         # checksum
-        crc32_comp = 0
+        crc32_comp = {"crc": 0}
 
         # file
         f = gpt.FILE(fn, "wb") if fn is not None else None
@@ -621,30 +647,59 @@ def save(filename, objs, params):
         ]
 
         # group blocks
-        read_blocks = blocks
-        block_reduce = 1
-        max_read_blocks = get_param(params, "max_read_blocks", 8)
-        while read_blocks > max_read_blocks and read_blocks % 2 == 0:
-            pos = [
-                numpy.concatenate((pos[2 * i + 0], pos[2 * i + 1]))
-                for i in range(read_blocks // 2)
-            ]
-            block_data_size_single *= 2
-            block_data_size_fp16 *= 2
-            read_blocks //= 2
-            block_reduce *= 2
+        (
+            pos,
+            block_data_size_single,
+            block_data_size_fp16,
+            read_blocks,
+            block_reduce,
+        ) = group_blocks(
+            params, pos, block_data_size_single, block_data_size_fp16, nbasis
+        )
 
         # make read-only to enable caching
         for x in pos:
             x.setflags(write=0)
 
+        # chunk k is checksummed and written on a background thread from one of
+        # two staging buffers while chunk k + 1 is distributed and converted
+        writer = gpt.core.io.pipeline.pipeline(2)
+        staging = [memoryview(bytearray()), memoryview(bytearray())]
+        writes = []
+
+        def write_chunk(data):
+            dt["crc"] -= gpt.time()
+            crc32_comp["crc"] = gpt.crc32(data, crc32_comp["crc"])
+            dt["crc"] += gpt.time()
+            dt["fwrite"] -= gpt.time()
+            f.write(data)
+            dt["fwrite"] += gpt.time()
+
+        def chunk_buffer(sz):
+            # buffer was last used by chunk k - 2
+            k = len(writes)
+            if k >= 2:
+                writes[k - 2].result()
+                writes[k - 2] = None
+            if len(staging[k % 2]) < sz:
+                staging[k % 2] = memoryview(bytearray(sz))
+            return staging[k % 2][0:sz]
+
+        def submit_chunk(data):
+            fgrid.barrier()
+            if f is not None:
+                writes.append(writer.submit(lambda: write_chunk(data)))
+                globalWriteGB = len(data) / 1024.0 ** 3.0
+            else:
+                globalWriteGB = 0.0
+            dt["GB"] += fgrid.globalsum(globalWriteGB)
+
         # single-precision data
-        data = memoryview(bytearray(block_data_size_single * nsingleCap))
         data_munged = memoryview(bytearray(block_data_size_single * nsingleCap))
 
         for b in range(read_blocks):
             fgrid.barrier()
-            dt_distr -= gpt.time()
+            dt["distr"] -= gpt.time()
             lhs_size = basis[0].otype.nfloats * 4 * len(pos[b])
             lhs = data_munged[0:lhs_size]
             distribute_plan = gpt.copy_plan(lhs, basis[0])
@@ -661,43 +716,24 @@ def save(filename, objs, params):
                     ],
                     basis[i],
                 )
-            dt_distr += gpt.time()
+            dt["distr"] += gpt.time()
 
             if f is not None:
-                dt_munge -= gpt.time()
+                data = chunk_buffer(block_data_size_single * nsingleCap)
+                dt["munge"] -= gpt.time()
                 cgpt.munge_inner_outer(
                     data,
                     data_munged,
                     block_reduce,
                     nsingleCap,
                 )
-                dt_munge += gpt.time()
-                dt_crc -= gpt.time()
-                crc32_comp = gpt.crc32(data, crc32_comp)
-                dt_crc += gpt.time()
-
-            fgrid.barrier()
-            dt_fwrite -= gpt.time()
-            if f is not None:
-                f.write(data)
-                globalWriteGB = len(data) / 1024.0 ** 3.0
+                dt["munge"] += gpt.time()
+                submit_chunk(data)
             else:
-                globalWriteGB = 0.0
-            globalWriteGB = fgrid.globalsum(globalWriteGB)
-            dt_fwrite += gpt.time()
-            totalSizeGB += globalWriteGB
+                submit_chunk(None)
 
             if verbose:
-                gpt.message(
-                    "* write %g GB: fwrite at %g GB/s, crc32 at %g GB/s, munge at %g GB/s, distribute at %g GB/s"
-                    % (
-                        totalSizeGB,
-                        totalSizeGB / dt_fwrite,
-                        totalSizeGB / dt_crc,
-                        totalSizeGB / dt_munge,
-                        totalSizeGB / dt_distr,
-                    )
-                )
+                message_progress(False)
 
         # fp16 data
         if nbasis != nsingleCap:
@@ -708,10 +744,9 @@ def save(filename, objs, params):
             data_munged = memoryview(
                 bytearray(block_data_size_single * (nbasis - nsingleCap))
             )
-            data = memoryview(bytearray(block_data_size_fp16 * (nbasis - nsingleCap)))
             for b in range(read_blocks):
                 fgrid.barrier()
-                dt_distr -= gpt.time()
+                dt["distr"] -= gpt.time()
                 lhs_size = basis[0].otype.nfloats * 4 * len(pos[b])
                 lhs = data_munged[0:lhs_size]
                 distribute_plan = gpt.copy_plan(lhs, basis[0])
@@ -731,50 +766,29 @@ def save(filename, objs, params):
                         ],
                         basis[i],
                     )
-                dt_distr += gpt.time()
+                dt["distr"] += gpt.time()
 
                 if f is not None:
-                    dt_munge -= gpt.time()
+                    data = chunk_buffer(block_data_size_fp16 * (nbasis - nsingleCap))
+                    dt["munge"] -= gpt.time()
                     cgpt.munge_inner_outer(
                         data_fp32,
                         data_munged,
                         block_reduce,
                         nbasis - nsingleCap,
                     )
-                    dt_munge += gpt.time()
-                    dt_fp16 -= gpt.time()
+                    dt["munge"] += gpt.time()
+                    dt["fp16"] -= gpt.time()
                     cgpt.fp32_to_fp16(data, data_fp32, 24)
-                    dt_fp16 += gpt.time()
-                    dt_crc -= gpt.time()
-                    crc32_comp = gpt.crc32(data, crc32_comp)
-                    dt_crc += gpt.time()
-
-                fgrid.barrier()
-                dt_fwrite -= gpt.time()
-                if f is not None:
-                    f.write(data)
-                    globalWriteGB = len(data) / 1024.0 ** 3.0
+                    dt["fp16"] += gpt.time()
+                    submit_chunk(data)
                 else:
-                    globalWriteGB = 0.0
-                globalWriteGB = fgrid.globalsum(globalWriteGB)
-                dt_fwrite += gpt.time()
-                totalSizeGB += globalWriteGB
+                    submit_chunk(None)
 
                 if verbose:
-                    gpt.message(
-                        "* write %g GB: fwrite at %g GB/s, crc32 at %g GB/s, munge at %g GB/s, distribute at %g GB/s, fp16 at %g GB/s"
-                        % (
-                            totalSizeGB,
-                            totalSizeGB / dt_fwrite,
-                            totalSizeGB / dt_crc,
-                            totalSizeGB / dt_munge,
-                            totalSizeGB / dt_distr,
-                            totalSizeGB / dt_fp16,
-                        )
-                    )
+                    message_progress(True)
 
         # coarse grid data
-        data = memoryview(bytearray(coarse_vector_size))
         data_fp32 = memoryview(bytearray(cevec[0].otype.nfloats * 4 * len(pos_coarse)))
         distribute_plan = gpt.copy_plan(data_fp32, cevec[0])
         distribute_plan.destination += gpt.global_memory_view(
@@ -784,12 +798,13 @@ def save(filename, objs, params):
         distribute_plan = distribute_plan()
         for j in range(neigen):
             fgrid.barrier()
-            dt_distr -= gpt.time()
+            dt["distr"] -= gpt.time()
             distribute_plan(data_fp32, cevec[j])
-            dt_distr += gpt.time()
+            dt["distr"] += gpt.time()
 
             if f is not None:
-                dt_fp16 -= gpt.time()
+                data = chunk_buffer(coarse_vector_size)
+                dt["fp16"] -= gpt.time()
                 cgpt.fp32_to_mixed_fp32fp16(
                     data,
                     data_fp32,
@@ -797,37 +812,19 @@ def save(filename, objs, params):
                     coarse_block_size_part_fp16,
                     FP16_COEF_EXP_SHARE_FLOATS,
                 )
-                dt_fp16 += gpt.time()
-                dt_crc -= gpt.time()
-                crc32_comp = gpt.crc32(data, crc32_comp)
-                dt_crc += gpt.time()
-
-            fgrid.barrier()
-            dt_fwrite -= gpt.time()
-            if f is not None:
-                f.write(data)
-                globalWriteGB = len(data) / 1024.0 ** 3.0
+                dt["fp16"] += gpt.time()
+                submit_chunk(data)
             else:
-                globalWriteGB = 0.0
-            globalWriteGB = fgrid.globalsum(globalWriteGB)
-            dt_fwrite += gpt.time()
-            totalSizeGB += globalWriteGB
+                submit_chunk(None)
 
             if verbose and j % (neigen // 10) == 0:
-                gpt.message(
-                    "* write %g GB: fwrite at %g GB/s, crc32 at %g GB/s, munge at %g GB/s, distribute at %g GB/s, fp16 at %g GB/s"
-                    % (
-                        totalSizeGB,
-                        totalSizeGB / dt_fwrite,
-                        totalSizeGB / dt_crc,
-                        totalSizeGB / dt_munge,
-                        totalSizeGB / dt_distr,
-                        totalSizeGB / dt_fp16,
-                    )
-                )
+                message_progress(True)
+
+        # propagate errors of background thread
+        writer.wait()
 
         # save crc
-        crc32[cv.rank] = crc32_comp
+        crc32[cv.rank] = crc32_comp["crc"]
 
     # synchronize crc32
     fgrid.globalsum(crc32)
@@ -843,4 +840,4 @@ def save(filename, objs, params):
 
     # verbosity
     if verbose:
-        gpt.message("* save %g GB at %g GB/s" % (totalSizeGB, totalSizeGB / (t1 - t0)))
+        gpt.message("* save %g GB at %g GB/s" % (dt["GB"], dt["GB"] / (t1 - t0)))
@@ -0,0 +1,95 @@
+#
+#    GPT - Grid Python Toolkit
+#    Copyright (C) 2020  Christoph Lehner (christoph.lehner@ur.de, https://github.com/lehner/gpt)
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+#  Codecs for lattice data
+#
+#  - zlib, zstd, lz4: lossless, bytes of each word are shuffled such that
+#    exponents and mantissas of neighboring numbers are compressed together;
+#    zstd and lz4 need the zstandard and lz4 python modules
+#  - fp16: lossy, 16 bits per real number with an exponent shared by
+#    groups of real numbers within a site, as in the cevec format;
+#    groups of zeros are restored exactly
+#
+import cgpt, numpy, zlib
+
+lossless = ["zlib", "zstd", "lz4"]
+
+
+def compressor(name):
+    if name == "zlib":
+        return (lambda x: zlib.compress(x, 1)), zlib.decompress
+    elif name == "zstd":
+        import zstandard
+
+        return (
+            zstandard.ZstdCompressor().compress,
+            zstandard.ZstdDecompressor().decompress,
+        )
+    elif name == "lz4":
+        import lz4.frame
+
+        return lz4.frame.compress, lz4.frame.decompress
+    assert 0
+
+
+# tag stored in index, includes all information needed to decode
+def tag(name, otype):
+    if name in lossless:
+        return name
+    elif name == "fp16":
+        nfloats = 2 * int(numpy.prod(otype.shape))
+        nshare = max([n for n in range(1, min(nfloats, 24) + 1) if nfloats % n == 0])
+        return f"fp16/{nshare}"
+    raise Exception(f"Unknown codec {name}")
+
+
+def encode(tag, mv, word):
+    if tag in lossless:
+        compress, decompress = compressor(tag)
+        data = numpy.frombuffer(mv, dtype=numpy.uint8).reshape(-1, word)
+        return memoryview(compress(numpy.ascontiguousarray(data.T)))
+    elif tag[0:5] == "fp16/":
+        nshare = int(tag[5:])
+        src = numpy.frombuffer(mv, dtype=numpy.float32 if word == 4 else numpy.float64)
+        src = src.astype(numpy.float32, copy=False).reshape(-1, nshare)
+        # the shared exponent of a group of zeros is not representable, such
+        # groups are encoded with exponent zero which decodes to exact zeros
+        zero = ~numpy.any(src, axis=1)
+        if numpy.any(zero):
+            src = src.copy()
+            src[zero] = 1.0
+        dst = memoryview(bytearray(src.shape[0] * (nshare + 1) * 2))
+        cgpt.fp32_to_fp16(dst, memoryview(src.reshape(-1)), nshare)
+        numpy.frombuffer(dst, dtype=numpy.uint16).reshape(-1, nshare + 1)[zero] = 0
+        return dst
+    assert 0
+
+
+def decode(tag, mv, word):
+    if tag in lossless:
+        compress, decompress = compressor(tag)
+        data = numpy.frombuffer(decompress(mv), dtype=numpy.uint8).reshape(word, -1)
+        return memoryview(numpy.ascontiguousarray(data.T)).cast("B")
+    elif tag[0:5] == "fp16/":
+        nshare = int(tag[5:])
+        dst = numpy.empty((len(mv) // 2 // (nshare + 1) * nshare,), numpy.float32)
+        cgpt.fp16_to_fp32(memoryview(dst), mv, nshare)
+        if word == 8:
+            dst = dst.astype(numpy.float64)
+        return memoryview(dst).cast("B")
+    assert 0
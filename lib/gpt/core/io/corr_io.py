@@ -16,60 +16,282 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
-import sys, os, struct, binascii, fnmatch, numpy, gpt
+#
+#  Correlator files are a sequence of records
+#
+#    tag length (int32), tag (utf-8, zero-terminated), crc32 (uint32),
+#    number of complex numbers ln (uint32), data (complex128[ln])
+#
+#  The writer keeps an index of the tags that is stored in fn + ".index" on
+#  flush and close.  It contains a table sorted by tag that allows for
+#  binary search without loading the index or the data:
+#
+#    "GPTCORR1", size of indexed data file (uint64), number of tags n (uint64),
+#    n x (data offset, ln, crc32, tag offset, tag length) as uint64,
+#    concatenated tags (utf-8)
+#
+#  If the index is missing or does not match the data file, the reader scans
+#  the record headers instead.  If a tag appears more than once, the last
+#  record is used.  The reader behaves like a read-only dict from tag to
+#  numpy array and iterates, also in glob, in the order of the records in
+#  the file.
+#
+#  Written records are only guaranteed to be in the file after flush() or
+#  close(), which also update the index.  Long-running jobs should flush
+#  periodically, e.g., once per source, such that a job that is interrupted
+#  keeps the correlators computed up to its last flush.
+#
+import os, struct, binascii, fnmatch, mmap, atexit, weakref, collections.abc, numpy, gpt
+
+index_magic = b"GPTCORR1"
+index_dtype = numpy.dtype(
+    [
+        ("offset", "<u8"),
+        ("length", "<u8"),
+        ("crc32", "<u8"),
+        ("tag", "<u8"),
+        ("tag_length", "<u8"),
+    ]
+)
+
+
+# writers that are not closed are drained at interpreter exit
+active = weakref.WeakSet()
+
+
+@atexit.register
+def close_all():
+    for w in list(active):
+        w.drain()
+
+
+def scan(fn):
+    # tag -> (data offset, ln, crc32) from record headers
+    entries = {}
+    size = os.path.getsize(fn)
+    with open(fn, "rb") as f:
+        pos = 0
+        while pos < size:
+            rd = f.read(4)
+            if len(rd) != 4:
+                raise Exception("Data corrupted!")
+            ntag = struct.unpack("i", rd)[0]
+            tag = f.read(ntag)
+            rd = f.read(4 * 2)
+            if len(tag) != ntag or len(rd) != 8:
+                raise Exception("Data corrupted!")
+            (crc32, ln) = struct.unpack("II", rd)
+            pos += 4 + ntag + 8
+            if pos + 16 * ln > size:
+                raise Exception("Data corrupted!")
+            entries[tag[0:-1].decode("utf-8")] = (pos, ln, crc32)
+            pos += 16 * ln
+            f.seek(pos, 0)
+    return entries
+
+
+def write_index(fn, size, entries):
+    tags = sorted(entries.keys())
+    encoded = [t.encode("utf-8") for t in tags]
+    table = numpy.zeros((len(tags),), dtype=index_dtype)
+    tag_offset = 0
+    for i, t in enumerate(tags):
+        table[i] = entries[t] + (tag_offset, len(encoded[i]))
+        tag_offset += len(encoded[i])
+    with open(fn + ".index", "wb") as f:
+        f.write(index_magic + struct.pack("<QQ", size, len(tags)))
+        f.write(table.tobytes())
+        f.write(b"".join(encoded))
+
+
+def read_index(fn):
+    # returns table and concatenated tags if index matches data file
+    fn_index = fn + ".index"
+    if not os.path.exists(fn_index) or os.path.getsize(fn_index) < 24:
+        return None
+    with open(fn_index, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[0:8] != index_magic:
+        return None
+    size, n = struct.unpack("<QQ", mm[8:24])
+    if size != os.path.getsize(fn) or len(mm) < 24 + n * index_dtype.itemsize:
+        return None
+    table = numpy.frombuffer(mm, dtype=index_dtype, count=n, offset=24)
+    return table, memoryview(mm)[24 + n * index_dtype.itemsize :]
 
 
 class writer:
-    def __init__(self, fn):
+    #
+    # Records are collected in a buffer that is written once it exceeds
+    # buffer_size bytes and on flush/close, ranks only synchronize in the
+    # latter.  A writer that is not closed writes its buffer and index when
+    # it is garbage collected or at interpreter exit, whichever comes first.
+    #
+    def __init__(self, fn, append=False, buffer_size=16 * 1024 ** 2):
+        self.fn = fn
+        self.entries = {}
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
         if gpt.rank() == 0:
-            self.f = open(fn, "w+b")
+            if append and os.path.exists(fn):
+                index = read_index(fn)
+                if index is None:
+                    self.entries = scan(fn)
+                else:
+                    table, tags = index
+                    for e in table:
+                        t0 = int(e["tag"])
+                        t = bytes(tags[t0 : t0 + int(e["tag_length"])]).decode("utf-8")
+                        self.entries[t] = (
+                            int(e["offset"]),
+                            int(e["length"]),
+                            int(e["crc32"]),
+                        )
+                self.f = open(fn, "ab")
+            else:
+                self.f = open(fn, "w+b")
+                if os.path.exists(fn + ".index"):
+                    os.unlink(fn + ".index")
+            self.position = self.f.tell()
+            active.add(self)
         else:
             self.f = None
 
+    def __del__(self):
+        self.drain()
+
     def write(self, t, cc):
         if self.f is not None:
-            self.f.write(struct.pack("i", len(t) + 1))
-            self.f.write((t + "\0").encode("utf-8"))
-            ln = len(cc)
-            ccr = [fff for sublist in ((c.real, c.imag) for c in cc) for fff in sublist]
-            bindata = struct.pack("d" * 2 * ln, *ccr)
-            crc32comp = binascii.crc32(bindata) & 0xFFFFFFFF
-            self.f.write(struct.pack("II", crc32comp, ln))
-            self.f.write(bindata)
+            tag = (t + "\0").encode("utf-8")
+            data = memoryview(
+                numpy.ascontiguousarray(cc, dtype=numpy.complex128).reshape(-1)
+            ).cast("B")
+            ln = len(data) // 16
+            crc32comp = binascii.crc32(data) & 0xFFFFFFFF
+            self.buffer += struct.pack("i", len(tag))
+            self.buffer += tag
+            self.buffer += struct.pack("II", crc32comp, ln)
+            self.buffer += data
+            self.position += 4 + len(tag) + 8
+            self.entries[t] = (self.position, ln, crc32comp)
+            self.position += len(data)
+            if len(self.buffer) >= self.buffer_size:
+                self.write_buffer()
+
+    def write_buffer(self):
+        self.f.write(self.buffer)
+        self.buffer = bytearray()
+
+    def flush(self):
+        if self.f is not None:
+            self.write_buffer()
             self.f.flush()
+            write_index(self.fn, self.position, self.entries)
 
         gpt.barrier()
 
-    def close(self):
+    def drain(self):
+        # local part of close, no synchronization between ranks
         if self.f is not None:
+            self.write_buffer()
             self.f.close()
+            write_index(self.fn, self.position, self.entries)
             self.f = None
+            active.discard(self)
 
+    def close(self):
+        self.drain()
         gpt.barrier()
 
 
-class reader:
+class tags(collections.abc.Mapping):
+    # read-only mapping from tag to numpy array, lookups use the table sorted
+    # by tag, iteration is in file order
     def __init__(self, fn):
-        self.tags = {}
-        f = open(fn, "r+b")
-        while True:
-            rd = f.read(4)
-            if len(rd) == 0:
-                break
-            ntag = struct.unpack("i", rd)[0]
-            tag = f.read(ntag).decode("utf-8")
-            (crc32, ln) = struct.unpack("II", f.read(4 * 2))
+        index = read_index(fn)
+        if index is None:
+            entries = scan(fn)
+            keys = sorted(entries.keys())
+            self.table = numpy.array(
+                [entries[k] + (0, 0) for k in keys], dtype=index_dtype
+            )
+            self.keys_cache = keys
+            self.tags = None
+        else:
+            self.table, self.tags = index
+            self.keys_cache = None
 
-            data = f.read(16 * ln)
-            crc32comp = binascii.crc32(data) & 0xFFFFFFFF
+        self.file_order = numpy.argsort(self.table["offset"], kind="stable")
 
-            if crc32comp != crc32:
-                raise Exception("Data corrupted!")
+        if len(self.table) > 0 and os.path.getsize(fn) > 0:
+            with open(fn, "rb") as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = b""
 
-            self.tags[tag[0:-1]] = numpy.frombuffer(
-                data, dtype=numpy.complex128, count=ln
-            )
-        f.close()
+    def __len__(self):
+        return len(self.table)
+
+    def key(self, i):
+        if self.keys_cache is not None:
+            return self.keys_cache[i]
+        e = self.table[i]
+        t0 = int(e["tag"])
+        return bytes(self.tags[t0 : t0 + int(e["tag_length"])]).decode("utf-8")
+
+    def bisect(self, tag):
+        # index of first key not less than tag
+        lo, hi = 0, len(self.table)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < tag:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, tag):
+        i = self.bisect(tag)
+        if i < len(self.table) and self.key(i) == tag:
+            return i
+        return None
+
+    def __contains__(self, tag):
+        return self.find(tag) is not None
+
+    def __getitem__(self, tag):
+        i = self.find(tag)
+        if i is None:
+            raise KeyError(tag)
+        e = self.table[i]
+        offset, ln = int(e["offset"]), int(e["length"])
+        data = memoryview(self.data)[offset : offset + 16 * ln]
+        if binascii.crc32(data) & 0xFFFFFFFF != int(e["crc32"]):
+            raise Exception("Data corrupted!")
+        return numpy.frombuffer(data, dtype=numpy.complex128, count=ln)
+
+    def __iter__(self):
+        for i in self.file_order:
+            yield self.key(i)
+
+    def glob(self, pattern):
+        # only keys starting with the literal prefix of pattern can match
+        prefix = pattern
+        for c in "*?[":
+            prefix = prefix.split(c)[0]
+        matches = []
+        for i in range(self.bisect(prefix), len(self.table)):
+            k = self.key(i)
+            if not k.startswith(prefix):
+                break
+            if fnmatch.fnmatch(k, pattern):
+                matches.append((int(self.table[i]["offset"]), k))
+        return [k for offset, k in sorted(matches)]
+
+
+class reader:
+    def __init__(self, fn):
+        self.tags = tags(fn)
 
     def glob(self, pattern):
-        return filter(lambda k: fnmatch.fnmatch(k, pattern), self.tags.keys())
+        return self.tags.glob(pattern)
@@ -16,9 +16,18 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
-import cgpt, gpt, os, io, numpy, sys, fnmatch, glob
+import cgpt, gpt, os, io, numpy, sys, fnmatch, glob, struct
 from gpt.params import params_convention
 
+# token types of the binary index
+index_tags = ["{", "}", "[", "]", "(", ")", "key", "int", "float", "complex"]
+index_tags += ["str", "array", "lattice"]
+index_tag_id = {t: i for i, t in enumerate(index_tags)}
+
+# arrays up to this size are read in bulk with a single broadcast
+small_array_bytes = 1024 ** 2
+max_bulk_bytes = 256 * 1024 ** 2
+
 # get local dir an filename
 def get_local_name(root, cv):
     if cv.rank < 0:
@@ -44,9 +53,23 @@ class gpt_io:
         self.params["grids"] = {}
         self.verbose = gpt.default.is_verbose("io")
 
+        # mmap=True maps the view files such that reads do not copy
+        self.memory_map = not write and "mmap" in params and params["mmap"]
+
+        # append=True adds to an existing container instead of replacing it
+        self.append = write and "append" in params and params["append"]
+        if self.append and not os.path.exists(root + "/index"):
+            self.append = False
+
+        # lazy=True returns lazy_lattice objects that read on first access
+        self.lazy = not write and "lazy" in params and params["lazy"]
+
         if gpt.rank() == 0:
             os.makedirs(self.root, exist_ok=True)
-            if write:
+            if self.append:
+                self.glb = gpt.FILE(root + "/global", "r+b")
+                self.glb.seek(0, 2)
+            elif write:
                 self.glb = gpt.FILE(root + "/global", "wb")
                 for f in glob.glob("%s/??/*.field" % self.root):
                     os.unlink(f)
@@ -60,8 +83,30 @@ class gpt_io:
         self.loc_desc = ""
         self.cache = {}
 
-        # If we write, keep an index buffer
+        # If we write, keep an index buffer and its binary version
         self.index_file = io.StringIO("") if write else None
+        self.index_tags = [] if write else None
+        self.index_payload = [] if write else None
+
+        # new objects are written as additional chunks of the index
+        if self.append:
+            self.index_file.write(
+                read_index_file(root + "/index").decode("utf-8", "strict")
+            )
+            if os.path.exists(root + "/index.bin"):
+                p = binary_index_parser(read_index_file(root + "/index.bin"))
+                self.index_tags = list(p.tags)
+                self.index_payload = [
+                    p.data[p.base + p.offsets[i] : p.base + p.offsets[i + 1]]
+                    for i in range(len(p.tags))
+                ]
+            else:
+                # container was written without binary index
+                self.index_tags = None
+
+        # small arrays read in bulk, ranges are collected in a first pass over the index
+        self.numpy_ranges = None
+        self.numpy_cache = {}
 
         # now sync since only root has created directory
         gpt.barrier()
@@ -75,14 +120,25 @@ class gpt_io:
         mvidx = memoryview(self.index_file.getvalue().encode("utf-8"))
 
         # write index to fs
-        index_crc = gpt.crc32(mvidx)
-        if gpt.rank() == 0:
-            f = open(self.root + "/index", "wb")
-            f.write(mvidx)
-            f.close()
-            f = open(self.root + "/index.crc32", "wt")
-            f.write("%X\n" % index_crc)
-            f.close()
+        write_index_file(self.root + "/index", mvidx)
+
+        # binary index: tag per token, offset table, and payload
+        if self.index_tags is not None:
+            offsets = numpy.cumsum(
+                [0] + [len(x) for x in self.index_payload], dtype=numpy.uint64
+            )
+            mvbin = memoryview(
+                b"".join(
+                    [
+                        b"GPTINDEX",
+                        len(self.index_tags).to_bytes(8, byteorder="little"),
+                        bytes(self.index_tags),
+                        offsets.astype("<u8").tobytes(),
+                    ]
+                    + self.index_payload
+                )
+            )
+            write_index_file(self.root + "/index.bin", mvbin)
 
     def close_views(self):
         for f in self.loc:
@@ -124,8 +180,13 @@ class gpt_io:
             if write and dn is not None:
                 os.makedirs(dn, exist_ok=True)
             self.loc[tag] = (
-                gpt.FILE(fn, "a+b" if write else "rb") if fn is not None else None
+                gpt.FILE(fn, "a+b" if write else "rb", memory_map=self.memory_map)
+                if fn is not None
+                else None
             )
+            if write and fn is not None:
+                # file may exist already in append mode
+                self.loc[tag].seek(0, 2)
             self.pos[tag] = gpt.coordinates(cv)
 
         return self.loc[tag], self.pos[tag]
@@ -152,14 +213,46 @@ class gpt_io:
         # describe
         res = g.describe() + " " + cv0.describe() + " " + l.describe()
 
+        # optional codec, its tag is stored in the index
+        codec = None
+        if "codec" in self.params and self.params["codec"] is not None:
+            codec = gpt.core.io.codec.tag(self.params["codec"], l.otype)
+            res += " codec=" + codec
+
         # find tasks for my node
         views_for_node = self.views_for_node(cv0, g)
 
         # performance
-        dt_distr, dt_crc, dt_write = 0.0, 0.0, 0.0
+        dt = {"distr": 0.0, "crc": 0.0, "write": 0.0, "GB": 0.0}
         # g.barrier()
         t0 = gpt.time()
-        szGB = 0.0
+
+        # checksum and write view k on background thread while view k + 1 is distributed
+        writer = gpt.core.io.pipeline.pipeline(2)
+
+        def write_view(f, iview, mv):
+            if codec is not None:
+                mv = gpt.core.io.codec.encode(codec, mv, g.precision.nbytes)
+
+            # description and data
+            dt["crc"] -= gpt.time()
+            crc = gpt.crc32(mv)
+            dt["crc"] += gpt.time()
+            dt["write"] -= gpt.time()
+            pos[iview] = f.tell()
+            f.write(ntag.to_bytes(4, byteorder="little"))
+            f.write(tag)
+            f.write(crc.to_bytes(4, byteorder="little"))
+            f.write(nd.to_bytes(4, byteorder="little"))
+            for i in range(nd):
+                f.write(g.gdimensions[i].to_bytes(4, byteorder="little"))
+            for i in range(nd):
+                f.write(g.mpi[i].to_bytes(4, byteorder="little"))
+            f.write(len(mv).to_bytes(8, byteorder="little"))
+            f.write(mv)
+            f.flush()
+            dt["write"] += gpt.time()
+            dt["GB"] += len(mv) / 1024.0 ** 3.0
 
         # need to write all views
         for xk, iview in enumerate(views_for_node):
@@ -173,31 +266,17 @@ class gpt_io:
             )
 
             # all nodes are needed to communicate
-            dt_distr -= gpt.time()
+            dt["distr"] -= gpt.time()
             mv = gpt.mview(l[p, self.cache[cache_key]])
-            dt_distr += gpt.time()
+            dt["distr"] += gpt.time()
 
             # write data
             if f is not None:
-                # description and data
-                dt_crc -= gpt.time()
-                crc = gpt.crc32(mv)
-                dt_crc += gpt.time()
-                dt_write -= gpt.time()
-                pos[iview] = f.tell()
-                f.write(ntag.to_bytes(4, byteorder="little"))
-                f.write(tag)
-                f.write(crc.to_bytes(4, byteorder="little"))
-                f.write(nd.to_bytes(4, byteorder="little"))
-                for i in range(nd):
-                    f.write(g.gdimensions[i].to_bytes(4, byteorder="little"))
-                for i in range(nd):
-                    f.write(g.mpi[i].to_bytes(4, byteorder="little"))
-                f.write(len(mv).to_bytes(8, byteorder="little"))
-                f.write(mv)
-                f.flush()
-                dt_write += gpt.time()
-                szGB += len(mv) / 1024.0 ** 3.0
+                writer.submit(lambda f=f, iview=iview, mv=mv: write_view(f, iview, mv))
+
+        # propagate errors of background thread
+        writer.wait()
+        dt_distr, dt_crc, dt_write, szGB = dt["distr"], dt["crc"], dt["write"], dt["GB"]
 
         t1 = gpt.time()
 
@@ -221,6 +300,10 @@ class gpt_io:
         g_desc = a[0]
         cv_desc = a[1]
         l_desc = a[2]
+        codec = None
+        if a[3][0:6] == "codec=":
+            codec = a[3][6:]
+            a = a[0:3] + a[4:]
         filepos = [int(x) for x in a[3:]]
 
         # first find grid
@@ -236,49 +319,92 @@ class gpt_io:
         views_for_node = self.views_for_node(cv0, g)
 
         # performance
-        dt_distr, dt_crc, dt_read = 0.0, 0.0, 0.0
-        szGB = 0.0
+        dt = {"distr": 0.0, "crc": 0.0, "read": 0.0, "GB": 0.0}
         g.barrier()
         t0 = gpt.time()
 
-        # need to load all views
-        for xk, iview in enumerate(views_for_node):
-            g.barrier()
-            dt_read -= gpt.time()
-
+        # read view k + 1 ahead on a background thread while view k is distributed
+        # and checksummed; the two staging buffers are re-used across views
+        reader = gpt.core.io.pipeline.pipeline(2)
+        checker = gpt.core.io.pipeline.pipeline(2)
+        staging = [memoryview(bytearray()), memoryview(bytearray())]
+
+        def read_view(f, iview, ibuffer):
+            if f is None:
+                return None, None
+            dt["read"] -= gpt.time()
+            f.seek(filepos[iview], 0)
+            ntag = int.from_bytes(f.read(4), byteorder="little")
+            f.read(ntag)  # not needed if index is present
+            crc_exp = int.from_bytes(f.read(4), byteorder="little")
+            nd = int.from_bytes(f.read(4), byteorder="little")
+            f.read(8 * nd)  # not needed if index is present
+            sz = int.from_bytes(f.read(8), byteorder="little")
+            if f.memory_map:
+                # view into the mapped file, pages are loaded on first access
+                data = f.read(sz)
+            else:
+                if len(staging[ibuffer]) < sz:
+                    staging[ibuffer] = memoryview(bytearray(sz))
+                data = staging[ibuffer][0:sz]
+                f.readinto(data)
+            dt["read"] += gpt.time()
+            dt["GB"] += sz / 1024.0 ** 3.0
+            if codec is not None:
+                # encoded data is checked before it is decoded here
+                check_view(data, crc_exp)
+                return gpt.core.io.codec.decode(codec, data, g.precision.nbytes), None
+            return data, crc_exp
+
+        def check_view(data, crc_exp):
+            dt["crc"] -= gpt.time()
+            crc_comp = gpt.crc32(data)
+            dt["crc"] += gpt.time()
+            assert crc_comp == crc_exp
+
+        def submit_read(xk):
+            iview = views_for_node[xk]
             f, pos = self.open_view(
                 xk, iview, False, cv_desc, g.fdimensions, g.cb, l.checkerboard()
             )
+            if f is None:
+                assert len(pos) == 0
+            return (
+                reader.submit(lambda: read_view(f, iview, xk % 2)),
+                pos,
+            )
+
+        # need to load all views
+        if len(views_for_node) > 0:
+            next_read = submit_read(0)
+        for xk, iview in enumerate(views_for_node):
 
             cache_key = f"{a[0:3]}_{g.obj}_{iview}_read"
             if cache_key not in self.cache:
                 self.cache[cache_key] = {}
 
-            if f is not None:
-                f.seek(filepos[iview], 0)
-                ntag = int.from_bytes(f.read(4), byteorder="little")
-                f.read(ntag)  # not needed if index is present
-                crc_exp = int.from_bytes(f.read(4), byteorder="little")
-                nd = int.from_bytes(f.read(4), byteorder="little")
-                f.read(8 * nd)  # not needed if index is present
-                sz = int.from_bytes(f.read(8), byteorder="little")
-                data = memoryview(f.read(sz))
-                dt_crc -= gpt.time()
-                crc_comp = gpt.crc32(data)
-                dt_crc += gpt.time()
-                assert crc_comp == crc_exp
-                sys.stdout.flush()
-                szGB += len(data) / 1024.0 ** 3.0
-            else:
-                assert len(pos) == 0
-                data = None
+            task, pos = next_read
+            data, crc_exp = task.result()
+
+            # buffer of view xk - 1 is free now
+            if xk + 1 < len(views_for_node):
+                next_read = submit_read(xk + 1)
+
+            check = None
+            if crc_exp is not None:
+                check = checker.submit(lambda d=data, c=crc_exp: check_view(d, c))
 
-            g.barrier()
-            dt_read += gpt.time()
-            dt_distr -= gpt.time()
+            dt["distr"] -= gpt.time()
             l[pos, self.cache[cache_key]] = data
-            g.barrier()
-            dt_distr += gpt.time()
+            dt["distr"] += gpt.time()
+
+            if check is not None:
+                check.result()
+
+        reader.wait()
+        checker.wait()
+        dt_distr, dt_crc, dt_read, szGB = dt["distr"], dt["crc"], dt["read"], dt["GB"]
+        sys.stdout.flush()
 
         g.barrier()
         t1 = gpt.time()
@@ -286,7 +412,7 @@ class gpt_io:
         szGB = g.globalsum(szGB)
         if self.verbose and dt_crc != 0.0:
             gpt.message(
-                "Read %g GB at %g GB/s (%g GB/s for distribution, %g GB/s for reading + checksum, %g GB/s for checksum, %d views per node)"
+                "Read %g GB at %g GB/s (%g GB/s for distribution, %g GB/s for reading, %g GB/s for checksum, %d views per node)"
                 % (
                     szGB,
                     szGB / (t1 - t0),
@@ -312,6 +438,8 @@ class gpt_io:
         return 0, 0
 
     def read_numpy(self, start, end):
+        if (start, end) in self.numpy_cache:
+            return self.numpy_cache.pop((start, end))
         if gpt.rank() == 0:
             self.glb.seek(start, 0)
             crc32_compare = int.from_bytes(self.glb.read(4), byteorder="little")
@@ -325,47 +453,107 @@ class gpt_io:
             assert crc32_computed == crc32_compare
         return numpy.load(io.BytesIO(data))
 
+    def read_numpy_bulk(self, ranges):
+        # merge small arrays that are close in the file into spans
+        spans = []
+        for start, end in sorted(set(ranges)):
+            if end - start > small_array_bytes:
+                continue
+            if (
+                len(spans) > 0
+                and start - spans[-1][1] <= small_array_bytes
+                and end - spans[-1][0] <= max_bulk_bytes
+            ):
+                spans[-1][1] = max(spans[-1][1], end)
+                spans[-1][2].append((start, end))
+            else:
+                spans.append([start, end, [(start, end)]])
+
+        # one read and one broadcast for each batch of spans
+        while len(spans) > 0:
+            batch = []
+            nbytes = 0
+            while len(spans) > 0 and (
+                len(batch) == 0 or nbytes + spans[0][1] - spans[0][0] <= max_bulk_bytes
+            ):
+                batch.append(spans.pop(0))
+                nbytes += batch[-1][1] - batch[-1][0]
+
+            if gpt.rank() == 0:
+                data = []
+                for start, end, arrays in batch:
+                    self.glb.seek(start, 0)
+                    data.append(self.glb.read(end - start))
+                data = b"".join(data)
+            else:
+                data = None
+            data = memoryview(gpt.broadcast(0, data))
+
+            offset = 0
+            for span_start, span_end, arrays in batch:
+                for start, end in arrays:
+                    mv = data[offset + start - span_start : offset + end - span_start]
+                    crc32_compare = int.from_bytes(mv[0:4], byteorder="little")
+                    assert gpt.crc32(mv[4:]) == crc32_compare
+                    self.numpy_cache[(start, end)] = numpy.load(io.BytesIO(mv[4:]))
+                offset += span_end - span_start
+
     def write(self, objs):
         self.create_index("", objs)
         self.flush()
 
+    def write_index(self, tag, text, payload=b""):
+        self.index_file.write(text + "\n")
+        if self.index_tags is not None:
+            self.index_tags.append(index_tag_id[tag])
+            self.index_payload.append(payload)
+
     def create_index(self, ctx, objs):
-        f = self.index_file
-        assert f is not None
+        assert self.index_file is not None
         if type(objs) == dict:
-            f.write("{\n")
+            self.write_index("{", "{")
             for x in objs:
-                f.write(x.encode("unicode_escape").decode("utf-8") + "\n")
+                self.write_index(
+                    "key", x.encode("unicode_escape").decode("utf-8"), x.encode("utf-8")
+                )
                 self.create_index("%s/%s" % (ctx, x), objs[x])
-            f.write("}\n")
+            self.write_index("}", "}")
         elif isinstance(
             objs, numpy.ndarray
         ):  # needs to be above list for proper precedence
-            f.write("array %d %d\n" % self.write_numpy(objs))
+            r = self.write_numpy(objs)
+            self.write_index("array", "array %d %d" % r, struct.pack("<QQ", *r))
         elif type(objs) == list:
-            f.write("[\n")
+            self.write_index("[", "[")
             for i, x in enumerate(objs):
                 self.create_index("%s/%d" % (ctx, i), x)
-            f.write("]\n")
+            self.write_index("]", "]")
         elif type(objs) == tuple:
-            f.write("(\n")
+            self.write_index("(", "(")
             for i, x in enumerate(objs):
                 self.create_index("%s/%d" % (ctx, i), x)
-            f.write(")\n")
-        elif type(objs) == float:
-            f.write("float %.16g\n" % objs)
+            self.write_index(")", ")")
+        elif type(objs) == float or type(objs) == numpy.float64:
+            # improve: avoid implicit type conversion
+            objs = float(objs)
+            self.write_index("float", "float %.16g" % objs, struct.pack("<d", objs))
         elif type(objs) == int:
-            f.write("int %d\n" % objs)
+            self.write_index("int", "int %d" % objs, str(objs).encode("utf-8"))
         elif type(objs) == str:
-            f.write("str " + objs.encode("unicode_escape").decode("utf-8") + "\n")
+            self.write_index(
+                "str",
+                "str " + objs.encode("unicode_escape").decode("utf-8"),
+                objs.encode("utf-8"),
+            )
         elif type(objs) == complex:
-            f.write("complex %.16g %.16g\n" % (objs.real, objs.imag))
+            self.write_index(
+                "complex",
+                "complex %.16g %.16g" % (objs.real, objs.imag),
+                struct.pack("<dd", objs.real, objs.imag),
+            )
         elif type(objs) == gpt.lattice:
-            f.write("lattice %s\n" % self.write_lattice(ctx, objs))
-        elif type(objs) == numpy.float64:
-            f.write(
-                "float %.16g\n" % float(objs)
-            )  # improve: avoid implicit type conversion
+            desc = self.write_lattice(ctx, objs)
+            self.write_index("lattice", "lattice %s" % desc, desc.encode("utf-8"))
         else:
             print("Unknown type: ", type(objs))
             assert 0
@@ -388,7 +576,7 @@ class gpt_io:
                 if cmd == "}":
                     p.skip()
                     break
-                key = p.get_str(0)
+                key = p.get_key()
                 res[key] = self.read_index(p, ctx + "/" + key)
             return res
         elif cmd == "[":
@@ -412,33 +600,101 @@ class gpt_io:
                 res.append(self.read_index(p, ctx + ("/%d" % len(res))))
             return tuple(res)
         elif cmd == "int":
-            return int(p.get()[1])
+            return p.get_int()
         elif cmd == "float":
-            return float(p.get()[1])
+            return p.get_float()
         elif cmd == "complex":
-            a = p.get()
-            return complex(float(a[1]), float(a[2]))
+            return p.get_complex()
         elif cmd == "str":
-            return p.get_str(1)
+            return p.get_value_str()
         elif cmd == "array":
-            a = p.get()  # array start end
+            start, end = p.get_array()
             if not self.keep_context(ctx):
                 return None
-            return self.read_numpy(int(a[1]), int(a[2]))
+            if self.numpy_ranges is not None:
+                self.numpy_ranges.append((start, end))
+                return None
+            return self.read_numpy(start, end)
         elif cmd == "lattice":
-            a = p.get()
-            if not self.keep_context(ctx):
+            a = p.get_lattice()
+            if not self.keep_context(ctx) or self.numpy_ranges is not None:
                 return None
-            return self.read_lattice(a[1:])
+            if self.lazy:
+                return lazy_lattice(self, a)
+            return self.read_lattice(a)
         else:
             assert 0
 
 
+# lattice of a container that is read once it is first called
+class lazy_lattice:
+    def __init__(self, io, desc):
+        self.io = io
+        self.desc = desc
+        self.value = None
+
+    def describe(self):
+        return self.desc[2]
+
+    def __call__(self):
+        if self.value is None:
+            self.value = self.io.read_lattice(self.desc)
+            self.io.close_views()
+            self.io = None
+        return self.value
+
+
+def read_index_file(fn):
+    idx = open(fn, "rb").read()
+    crc_expected = int(open(fn + ".crc32", "rt").read(), 16)
+    crc_computed = gpt.crc32(memoryview(idx))
+    assert crc_expected == crc_computed
+    return idx
+
+
+def write_index_file(fn, mv):
+    crc = gpt.crc32(mv)
+    if gpt.rank() == 0:
+        f = open(fn, "wb")
+        f.write(mv)
+        f.close()
+        f = open(fn + ".crc32", "wt")
+        f.write("%X\n" % crc)
+        f.close()
+
+
+# text index, kept to read containers without binary index
 class index_parser:
     def __init__(self, lines):
         self.lines = lines
         self.line = 0
 
+    def reset(self):
+        self.line = 0
+
+    def get_key(self):
+        return self.get_str(0)
+
+    def get_int(self):
+        return int(self.get()[1])
+
+    def get_float(self):
+        return float(self.get()[1])
+
+    def get_complex(self):
+        a = self.get()
+        return complex(float(a[1]), float(a[2]))
+
+    def get_value_str(self):
+        return self.get_str(1)
+
+    def get_array(self):
+        a = self.get()  # array start end
+        return int(a[1]), int(a[2])
+
+    def get_lattice(self):
+        return self.get()[1:]
+
     def peek(self):
         return self.lines[self.line].split(" ")
 
@@ -461,6 +717,59 @@ class index_parser:
         return self.line == (len(self.lines) - 1)
 
 
+# binary index: tag per token, offset table into the payload, and payload
+class binary_index_parser:
+    def __init__(self, data):
+        assert data[0:8] == b"GPTINDEX"
+        n = int.from_bytes(data[8:16], byteorder="little")
+        self.data = data
+        self.tags = data[16 : 16 + n]
+        self.offsets = numpy.frombuffer(
+            data, dtype="<u8", count=n + 1, offset=16 + n
+        ).tolist()
+        self.base = 16 + n + 8 * (n + 1)
+        self.token = 0
+
+    def reset(self):
+        self.token = 0
+
+    def cmd(self):
+        return index_tags[self.tags[self.token]]
+
+    def skip(self):
+        self.token += 1
+
+    def get(self):
+        i = self.token
+        self.token += 1
+        return self.data[self.base + self.offsets[i] : self.base + self.offsets[i + 1]]
+
+    def get_key(self):
+        return self.get().decode("utf-8")
+
+    def get_int(self):
+        return int(self.get())
+
+    def get_float(self):
+        return struct.unpack("<d", self.get())[0]
+
+    def get_complex(self):
+        return complex(*struct.unpack("<dd", self.get()))
+
+    def get_value_str(self):
+        return self.get().decode("utf-8")
+
+    def get_array(self):
+        return struct.unpack("<QQ", self.get())
+
+    def get_lattice(self):
+        return self.get().decode("utf-8").split(" ")
+
+    def eof(self):
+        assert self.token <= len(self.tags)
+        return self.token == len(self.tags)
+
+
 @params_convention()
 def writer(filename, params):
     return gpt_io(filename, True, params)
@@ -502,22 +811,33 @@ def load(filename, params):
     if x.verbose:
         gpt.message("Reading %s" % filename)
 
-    # read index
-    idx = open(filename + "/index", "rb").read()
-    crc_expected = int(open(filename + "/index.crc32", "rt").read(), 16)
-    crc_computed = gpt.crc32(memoryview(idx))
-    assert crc_expected == crc_computed
-
-    p = index_parser(idx.decode("utf-8", "strict").split("\n"))
-    res = x.read_index(p)
-
-    # if multiple chunks are available, return them as a list
-    if not p.eof():
-        res = [res]
-        while not p.eof():
-            res.append(x.read_index(p))
-
-    # close
+    # read index, prefer binary version
+    if os.path.exists(filename + "/index.bin"):
+        p = binary_index_parser(read_index_file(filename + "/index.bin"))
+    else:
+        idx = read_index_file(filename + "/index")
+        p = index_parser(idx.decode("utf-8", "strict").split("\n"))
+
+    def read_chunks():
+        res = x.read_index(p)
+
+        # if multiple chunks are available, return them as a list
+        if not p.eof():
+            res = [res]
+            while not p.eof():
+                res.append(x.read_index(p))
+        return res
+
+    # first pass collects the small arrays to read them at once
+    x.numpy_ranges = []
+    read_chunks()
+    x.read_numpy_bulk(x.numpy_ranges)
+    x.numpy_ranges = None
+    p.reset()
+
+    res = read_chunks()
+
+    # close, lazy lattices re-open the views they need on first access
     x.close()
 
     # goodbye
@@ -16,40 +16,21 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
-import gpt, cgpt
+import gpt
 from gpt.params import params_convention
 
-# load through cgpt backend (NerscIO, openQCD, ...)
-def load_cgpt(*a):
-    result = []
-    r, metadata = cgpt.load(*a, gpt.default.is_verbose("io"))
-    if r is None:
-        raise gpt.LoadError()
-    for gr in r:
-        grid = gpt.grid(gr[1], eval("gpt." + gr[2]), eval("gpt." + gr[3]), gr[0])
-        result_grid = []
-        otype = gpt.ot_matrix_su_n_fundamental_group(3)
-        for t_obj, s_ot, s_pr in gr[4]:
-            assert s_pr == gr[2]
-
-            # only allow loading su3 gauge fields from cgpt, rest done in python
-            # in the long run, replace *any* IO from cgpt with gpt code
-            assert s_ot == "ot_mcolor3"
-
-            l = gpt.lattice(grid, otype, [t_obj])
-            l.metadata = metadata
-            result_grid.append(l)
-        result.append(result_grid)
-    while len(result) == 1:
-        result = result[0]
-    return result
-
-
 # input
 @params_convention()
 def load(fn, p={}):
 
-    supported = [gpt.core.io.gpt_io, gpt.core.io.cevec_io, gpt.core.io.qlat_io]
+    # openQCD file format is minimal, not distinctive, test last
+    supported = [
+        gpt.core.io.gpt_io,
+        gpt.core.io.cevec_io,
+        gpt.core.io.qlat_io,
+        gpt.core.io.nersc_io,
+        gpt.core.io.openQCD_io,
+    ]
 
     for fmt in supported:
         try:
@@ -57,7 +38,4 @@ def load(fn, p={}):
         except NotImplementedError:
             pass
 
-    a = [fn]
-    if len(p) > 0:
-        a.append(p)
-    return load_cgpt(*a)
+    raise gpt.LoadError()
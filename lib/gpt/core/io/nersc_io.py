@@ -0,0 +1,198 @@
+#
+#    GPT - Grid Python Toolkit
+#    Copyright (C) 2020  Christoph Lehner (christoph.lehner@ur.de, https://github.com/lehner/gpt)
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+#  Parallel reader for NERSC gauge configurations
+#
+import gpt, numpy, os
+
+floating_point_formats = {
+    "IEEE32BIG": ">f4",
+    "IEEE32": "<f4",
+    "IEEE32LITTLE": "<f4",
+    "IEEE64BIG": ">f8",
+    "IEEE64": "<f8",
+    "IEEE64LITTLE": "<f8",
+}
+
+data_types = {"4D_SU3_GAUGE": 2, "4D_SU3_GAUGE_3x3": 3}
+
+
+def read_header(fn):
+    if not os.path.isfile(fn):
+        return None, None
+
+    fields = {}
+    with open(fn, "rb") as f:
+        line = f.readline(1024)
+        if line.strip() != b"BEGIN_HEADER":
+            return None, None
+        while True:
+            line = f.readline(1024)
+            if len(line) == 0:
+                return None, None
+            line = "".join(line.decode("utf-8", "replace").split())
+            if line == "END_HEADER":
+                break
+            if "=" in line:
+                k, v = line.split("=", 1)
+                fields[k] = v
+        return fields, f.tell()
+
+
+def load(filename, params):
+
+    # first check if this is right file format
+    fields, offset = read_header(filename)
+    if fields is None:
+        raise NotImplementedError()
+
+    # unsupported data layouts
+    if (
+        fields.get("DATATYPE") not in data_types
+        or fields.get("FLOATING_POINT") not in floating_point_formats
+        or any([f"DIMENSION_{i+1}" not in fields for i in range(4)])
+    ):
+        raise NotImplementedError()
+
+    verbose = gpt.default.is_verbose("io")
+    if verbose:
+        gpt.message(f"NERSC file format; reading {filename}")
+        for k in fields:
+            gpt.message(f"\t{k} = {fields[k]}")
+
+    # layout of data
+    fdimensions = [int(fields[f"DIMENSION_{i+1}"]) for i in range(4)]
+    dtype = numpy.dtype(floating_point_formats[fields["FLOATING_POINT"]])
+    rows = data_types[fields["DATATYPE"]]
+    site_size = 4 * rows * 3 * 2 * dtype.itemsize
+
+    # create lattices
+    g = gpt.grid(fdimensions, gpt.double)
+    U = [gpt.mcolor(g) for mu in range(4)]
+
+    # performance
+    dt_distr, dt_crc, dt_read = 0.0, 0.0, 0.0
+    szGB = 0.0
+    g.barrier()
+    t0 = gpt.time()
+
+    # sites are stored lexicographically with the last dimension running slowest,
+    # so the file splits into contiguous slabs that are read by different ranks
+    nslab = max(
+        [
+            n
+            for n in range(1, min(g.Nprocessors, fdimensions[-1]) + 1)
+            if fdimensions[-1] % n == 0
+        ]
+    )
+    cv_desc = [1, 1, 1, nslab]
+    slab_size = site_size * int(numpy.prod(fdimensions)) // nslab
+
+    # at most max_io_nodes ranks read at the same time
+    cv0 = gpt.cartesian_view(-1, cv_desc, fdimensions, g.cb, gpt.none)
+    views_for_node = cv0.views_for_node(g)
+
+    # checksum is the sum of all 32-bit words in host byte order
+    checksum = numpy.zeros((1,), dtype=numpy.uint64)
+    memory_map = "mmap" in params and params["mmap"]
+
+    for iview in views_for_node:
+        g.barrier()
+        dt_read -= gpt.time()
+
+        cv = gpt.cartesian_view(
+            iview if iview is not None else -1, cv_desc, fdimensions, g.cb, gpt.none
+        )
+        pos = gpt.coordinates(cv)
+
+        if iview is not None:
+            f = gpt.FILE(filename, "rb", memory_map=memory_map)
+            f.seek(offset + iview * slab_size, 0)
+            data = numpy.frombuffer(f.read(slab_size), dtype=dtype)
+            f.close()
+
+            data = data.astype(dtype.newbyteorder("="), copy=False)
+
+            dt_crc -= gpt.time()
+            checksum[0] += numpy.sum(data.view(numpy.uint32), dtype=numpy.uint64)
+            dt_crc += gpt.time()
+
+            data = data.astype(numpy.float64).view(numpy.complex128)
+            data = data.reshape(len(pos), 4, rows, 3)
+
+            # reconstruct third row from unitarity
+            if rows == 2:
+                data = numpy.concatenate(
+                    (
+                        data,
+                        numpy.conj(numpy.cross(data[:, :, 0], data[:, :, 1]))[
+                            :, :, None, :
+                        ],
+                    ),
+                    axis=2,
+                )
+
+            szGB += slab_size / 1024.0 ** 3.0
+        else:
+            assert len(pos) == 0
+            data = numpy.zeros((0, 4, 3, 3), dtype=numpy.complex128)
+
+        g.barrier()
+        dt_read += gpt.time()
+
+        # distributes data accordingly
+        dt_distr -= gpt.time()
+        for mu in range(4):
+            U[mu][pos] = numpy.ascontiguousarray(data[:, mu])
+        g.barrier()
+        dt_distr += gpt.time()
+
+    # checks
+    g.globalsum(checksum)
+    checksum = int(checksum[0]) & 0xFFFFFFFF
+    if "CHECKSUM" in fields:
+        assert checksum == int(fields["CHECKSUM"], 16)
+
+    if "PLAQUETTE" in fields:
+        plaquette = gpt.qcd.gauge.plaquette(U)
+        assert abs(plaquette - float(fields["PLAQUETTE"])) < 1e-5
+
+    if "LINK_TRACE" in fields:
+        link_trace = sum([gpt.sum(gpt.trace(u)).real for u in U]) / g.fsites / 4 / 3
+        assert abs(link_trace - float(fields["LINK_TRACE"])) < 1e-6
+
+    g.barrier()
+    t1 = gpt.time()
+
+    szGB = g.globalsum(szGB)
+    if verbose:
+        gpt.message(
+            "Read %g GB at %g GB/s (%g GB/s for distribution, %g GB/s for reading + checksum, %d views per node)"
+            % (
+                szGB,
+                szGB / (t1 - t0),
+                szGB / dt_distr,
+                szGB / dt_read,
+                len(views_for_node),
+            )
+        )
+
+    for u in U:
+        u.metadata = fields
+
+    return U
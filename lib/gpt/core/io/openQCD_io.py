@@ -0,0 +1,174 @@
+#
+#    GPT - Grid Python Toolkit
+#    Copyright (C) 2020  Christoph Lehner (christoph.lehner@ur.de, https://github.com/lehner/gpt)
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+#  Parallel reader for openQCD gauge configurations
+#
+#  The file contains a header (int Nt, Nx, Ny, Nz; double plaquette) followed by
+#  eight SU(3) matrices for each odd site x in the order t, x, y, z (slow to fast):
+#  U_0(x), U_0(x - 0), U_1(x), U_1(x - 1), ..., with direction 0 in time.
+#
+import gpt, numpy, os
+
+header_size = 24
+site_size = 8 * 9 * 16
+
+
+def read_header(fn):
+    if not os.path.isfile(fn):
+        return None
+
+    with open(fn, "rb") as f:
+        header = f.read(header_size)
+    if len(header) != header_size:
+        return None
+
+    Nt, Nx, Ny, Nz = [int(x) for x in numpy.frombuffer(header[0:16], dtype="<i4")]
+    plaquette = float(numpy.frombuffer(header[16:24], dtype="<f8")[0])
+    fdimensions = [Nx, Ny, Nz, Nt]
+
+    # format is minimal, check everything we can
+    for L in fdimensions:
+        if L < 1 or L > 10000 or L % 2 != 0:
+            return None
+    if not (-100.0 <= plaquette <= 100.0):
+        return None
+    if (
+        os.path.getsize(fn)
+        != header_size + int(numpy.prod(fdimensions)) // 2 * site_size
+    ):
+        return None
+
+    fields = {f"DIMENSION_{i+1}": str(fdimensions[i]) for i in range(4)}
+    fields["PLAQUETTE"] = "%.15f" % plaquette
+    return fields
+
+
+def odd_coordinates(fdimensions, t0, t1):
+    Nx, Ny, Nz, Nt = fdimensions
+    t, x, y, z = numpy.meshgrid(
+        numpy.arange(t0, t1),
+        numpy.arange(Nx),
+        numpy.arange(Ny),
+        numpy.arange(Nz),
+        indexing="ij",
+    )
+    coor = numpy.stack((x, y, z, t), axis=-1).reshape(-1, 4).astype(numpy.int32)
+    return numpy.ascontiguousarray(coor[numpy.sum(coor, axis=1) % 2 == 1])
+
+
+def load(filename, params):
+
+    # first check if this is right file format
+    fields = read_header(filename)
+    if fields is None:
+        raise NotImplementedError()
+
+    verbose = gpt.default.is_verbose("io")
+    if verbose:
+        gpt.message(f"openQCD file format; reading {filename}")
+        for k in fields:
+            gpt.message(f"\t{k} = {fields[k]}")
+
+    # create lattices
+    fdimensions = [int(fields[f"DIMENSION_{i+1}"]) for i in range(4)]
+    g = gpt.grid(fdimensions, gpt.double)
+    U = [gpt.mcolor(g) for mu in range(4)]
+
+    # performance
+    dt_distr, dt_read = 0.0, 0.0
+    szGB = 0.0
+    g.barrier()
+    t0 = gpt.time()
+
+    # time runs slowest in the file, so it splits into contiguous slabs of time
+    # slices that are read by different ranks
+    Nt = fdimensions[3]
+    nslab = max([n for n in range(1, min(g.Nprocessors, Nt) + 1) if Nt % n == 0])
+    slab_sites = int(numpy.prod(fdimensions[0:3])) * (Nt // nslab) // 2
+    slab_size = slab_sites * site_size
+
+    # at most max_io_nodes ranks read at the same time
+    cv0 = gpt.cartesian_view(-1, [1, 1, 1, nslab], fdimensions, g.cb, gpt.none)
+    views_for_node = cv0.views_for_node(g)
+    memory_map = "mmap" in params and params["mmap"]
+
+    # openQCD direction to our direction
+    direction = [3, 0, 1, 2]
+
+    for iview in views_for_node:
+        g.barrier()
+        dt_read -= gpt.time()
+
+        if iview is not None:
+            f = gpt.FILE(filename, "rb", memory_map=memory_map)
+            f.seek(header_size + iview * slab_size, 0)
+            data = numpy.frombuffer(f.read(slab_size), dtype="<c16")
+            f.close()
+
+            data = data.astype(numpy.complex128, copy=False)
+            data = data.reshape(slab_sites, 8, 3, 3)
+
+            pos = odd_coordinates(
+                fdimensions, iview * (Nt // nslab), (iview + 1) * (Nt // nslab)
+            )
+            szGB += slab_size / 1024.0 ** 3.0
+        else:
+            data = numpy.zeros((0, 8, 3, 3), dtype=numpy.complex128)
+            pos = numpy.zeros((0, 4), dtype=numpy.int32)
+
+        g.barrier()
+        dt_read += gpt.time()
+
+        # distributes forward links of odd sites and of their even neighbors
+        dt_distr -= gpt.time()
+        for i, mu in enumerate(direction):
+            U[mu][pos] = numpy.ascontiguousarray(data[:, 2 * i + 0])
+            pos_bwd = pos.copy()
+            pos_bwd[:, mu] = (pos_bwd[:, mu] - 1) % fdimensions[mu]
+            U[mu][pos_bwd] = numpy.ascontiguousarray(data[:, 2 * i + 1])
+        g.barrier()
+        dt_distr += gpt.time()
+
+    # openQCD normalizes the plaquette differently and for open boundary
+    # conditions the boundary plaquettes are weighted, so only report it
+    if verbose:
+        plaquette = gpt.qcd.gauge.plaquette(U)
+        gpt.message(
+            f"Plaquette {plaquette} versus {float(fields['PLAQUETTE']) / 3.0} from header"
+        )
+
+    g.barrier()
+    t1 = gpt.time()
+
+    szGB = g.globalsum(szGB)
+    if verbose:
+        gpt.message(
+            "Read %g GB at %g GB/s (%g GB/s for distribution, %g GB/s for reading, %d views per node)"
+            % (
+                szGB,
+                szGB / (t1 - t0),
+                szGB / dt_distr,
+                szGB / dt_read,
+                len(views_for_node),
+            )
+        )
+
+    for u in U:
+        u.metadata = fields
+
+    return U
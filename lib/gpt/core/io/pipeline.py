@@ -0,0 +1,81 @@
+#
+#    GPT - Grid Python Toolkit
+#    Copyright (C) 2020  Christoph Lehner (christoph.lehner@ur.de, https://github.com/lehner/gpt)
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+import threading, queue
+
+
+class pipeline_task:
+    def __init__(self, f):
+        self.f = f
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def result(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class pipeline:
+    #
+    # Executes tasks in order on a background thread.  At most
+    # staging_buffers tasks are in flight at any time such that the
+    # memory held by queued tasks stays bounded.  Exceptions raised by
+    # a task are re-raised in the calling thread by the result() of the
+    # task and by wait().
+    #
+    # cgpt releases the GIL in fread, fwrite, fflush, and crc32 such that
+    # these overlap with work done in the calling thread.
+    #
+    def __init__(self, staging_buffers=2):
+        self.tasks = queue.Queue()
+        self.slots = threading.Semaphore(staging_buffers)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            try:
+                if self.error is None:
+                    task.value = task.f()
+                else:
+                    task.error = self.error
+            except Exception as e:
+                self.error = e
+                task.error = e
+            finally:
+                task.done.set()
+                self.slots.release()
+
+    def submit(self, f):
+        self.slots.acquire()
+        task = pipeline_task(f)
+        self.tasks.put(task)
+        return task
+
+    def wait(self):
+        self.tasks.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
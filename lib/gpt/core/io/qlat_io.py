@@ -27,8 +27,9 @@ import cgpt, gpt, numpy, os, sys
 
 
 class qlat_io:
-    def __init__(self, path):
+    def __init__(self, path, memory_map=False):
         self.path = path
+        self.memory_map = memory_map
         self.ldimensions = []
         self.fdimensions = []
         self.bytes_header = -1
@@ -124,50 +125,81 @@ class qlat_io:
         # performance
         dt_distr, dt_crc, dt_read, dt_misc = 0.0, 0.0, 0.0, 0.0
         szGB = 0.0
-        crc_comp = 0
         g.barrier()
         t0 = gpt.time()
 
-        # single file: each rank opens it and reads it all
-        g.barrier()
-        dt_read -= gpt.time()
-
-        cv = gpt.cartesian_view(
-            gpt.rank(), self.cv_desc, g.fdimensions, g.cb, l.checkerboard()
+        # sites are stored lexicographically with the last dimension running slowest,
+        # so the file splits into contiguous slabs that are read by different ranks
+        nslab = max(
+            [
+                n
+                for n in range(1, min(g.Nprocessors, self.fdimensions[-1]) + 1)
+                if self.fdimensions[-1] % n == 0
+            ]
         )
-        pos = gpt.coordinates(cv)
-
-        if gpt.rank() == 0:
-            f = gpt.FILE(self.path, "rb")
-            f.seek(self.bytes_header, 0)
-            sz = self.size * int(numpy.prod(g.fdimensions))
-            data = memoryview(bytearray(f.read(sz)))
-            f.close()
-
-            dt_crc -= gpt.time()
-            crc_comp = gpt.crc32(data)
-            crc_comp = f"{crc_comp:8X}"
-            assert crc_comp == self.crc_exp
-            dt_crc += gpt.time()
-
-            dt_misc -= gpt.time()
-            self.swap(data)
-            dt_misc += gpt.time()
-
-            sys.stdout.flush()
-            szGB += len(data) / 1024.0 ** 3.0
-        else:
-            assert len(pos) == 0
-            data = None
-
-        g.barrier()
-        dt_read += gpt.time()
-
-        # distributes data accordingly
-        dt_distr -= gpt.time()
-        l[pos] = data
-        g.barrier()
-        dt_distr += gpt.time()
+        cv_desc = [1] * (len(self.fdimensions) - 1) + [nslab]
+        slab_size = self.size * int(numpy.prod(g.fdimensions)) // nslab
+
+        # at most max_io_nodes ranks read at the same time
+        cv0 = gpt.cartesian_view(-1, cv_desc, g.fdimensions, g.cb, l.checkerboard())
+        views_for_node = cv0.views_for_node(g)
+
+        # checksum of each slab, combined after reading
+        crc_slab = numpy.zeros((nslab,), dtype=numpy.uint64)
+
+        for iview in views_for_node:
+            g.barrier()
+            dt_read -= gpt.time()
+
+            cv = gpt.cartesian_view(
+                iview if iview is not None else -1,
+                cv_desc,
+                g.fdimensions,
+                g.cb,
+                l.checkerboard(),
+            )
+            pos = gpt.coordinates(cv)
+
+            if iview is not None:
+                f = gpt.FILE(self.path, "rb", memory_map=self.memory_map)
+                f.seek(self.bytes_header + iview * slab_size, 0)
+                if self.memory_map:
+                    # private mapping, swap below only touches our copy of the pages
+                    data = f.read(slab_size)
+                else:
+                    data = memoryview(bytearray(slab_size))
+                    f.readinto(data)
+                f.close()
+
+                dt_crc -= gpt.time()
+                crc_slab[iview] = gpt.crc32(data)
+                dt_crc += gpt.time()
+
+                dt_misc -= gpt.time()
+                self.swap(data)
+                dt_misc += gpt.time()
+
+                szGB += len(data) / 1024.0 ** 3.0
+            else:
+                assert len(pos) == 0
+                data = None
+
+            g.barrier()
+            dt_read += gpt.time()
+
+            # distributes data accordingly
+            dt_distr -= gpt.time()
+            l[pos] = data
+            g.barrier()
+            dt_distr += gpt.time()
+
+        # combine checksums in file order
+        g.globalsum(crc_slab)
+        crc_comp = int(crc_slab[0])
+        for i in range(1, nslab):
+            crc_comp = gpt.crc32_combine(crc_comp, int(crc_slab[i]), slab_size)
+        crc_comp = f"{crc_comp:8X}"
+        assert crc_comp == self.crc_exp
 
         g.barrier()
         t1 = gpt.time()
@@ -182,7 +214,7 @@ class qlat_io:
                     szGB / dt_distr,
                     szGB / dt_read,
                     szGB / dt_crc,
-                    1,
+                    len(views_for_node),
                 )
             )
         return l
@@ -190,7 +222,7 @@ class qlat_io:
 
 def load(filename, p={}):
 
-    qlat = qlat_io(filename)
+    qlat = qlat_io(filename, "mmap" in p and p["mmap"])
 
     # check if this is right file format from header
     if not qlat.read_header():
@@ -38,7 +38,11 @@ class format:
 
 
 # output
-def save(filename, objs, fmt=format.gpt()):
+def save(filename, objs, fmt=format.gpt(), **params):
+
+    # additional parameters, e.g., codec="zstd", extend those of the format
+    if len(params) > 0:
+        fmt = type(fmt)({**fmt.params, **params})
 
     if type(fmt) == format.gpt:
         return gpt.core.io.gpt_io.save(filename, objs, fmt.params)
@@ -32,3 +32,46 @@ def crc32(view, crc32_prev=0):
         return cgpt.util_crc32(view, crc32_prev)
     else:
         return crc32(memoryview(view), crc32_prev)
+
+
+# crc32 of the concatenation of two blocks from their checksums, follows zlib
+def gf2_matrix_times(mat, vec):
+    s = 0
+    i = 0
+    while vec:
+        if vec & 1:
+            s ^= mat[i]
+        vec >>= 1
+        i += 1
+    return s
+
+
+def gf2_matrix_square(mat):
+    return [gf2_matrix_times(mat, mat[n]) for n in range(32)]
+
+
+def crc32_combine(crc1, crc2, len2):
+    if len2 <= 0:
+        return crc1
+
+    # operator for one zero bit in odd, then two and four zero bits
+    odd = [0xEDB88320] + [1 << n for n in range(31)]
+    even = gf2_matrix_square(odd)
+    odd = gf2_matrix_square(even)
+
+    # apply len2 zero bytes to crc1
+    while True:
+        even = gf2_matrix_square(odd)
+        if len2 & 1:
+            crc1 = gf2_matrix_times(even, crc1)
+        len2 >>= 1
+        if len2 == 0:
+            break
+        odd = gf2_matrix_square(even)
+        if len2 & 1:
+            crc1 = gf2_matrix_times(odd, crc1)
+        len2 >>= 1
+        if len2 == 0:
+            break
+
+    return crc1 ^ crc2
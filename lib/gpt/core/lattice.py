@@ -16,8 +16,13 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
-import cgpt, gpt, numpy
-from gpt.default import is_verbose
+import cgpt, gpt, numpy, collections, hashlib
+from gpt.default import (
+    is_verbose,
+    lattice_pool_max_gb,
+    copy_plan_cache_size,
+    copy_plan_cache_max_gb,
+)
 from gpt.core.expr import factor
 from gpt.core.mem import host
 
@@ -29,6 +34,255 @@ def get_mem_book():
     return mem_book
 
 
+# pool of released lattice memory
+class lattice_pool:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.free = collections.OrderedDict()  # least recently used first
+        self.bytes = 0
+        self.stats = {"hit": 0, "miss": 0, "evict": 0, "peak_bytes": 0}
+
+    def rank_bytes(self, grid, otype):
+        return otype.nfloats * grid.gsites * grid.precision.nbytes // grid.Nprocessors
+
+    def allocate(self, grid, otype):
+        key = (grid.obj, otype.__name__)
+        if key in self.free:
+            self.free.move_to_end(key)
+            entries = self.free[key]
+            grid_ref, v_obj, nbytes = entries.pop()
+            if len(entries) == 0:
+                del self.free[key]
+            self.bytes -= nbytes
+            self.stats["hit"] += 1
+            # freshly created lattices start on the even checkerboard
+            if grid.cb.n != 1:
+                for o in v_obj:
+                    cgpt.lattice_change_checkerboard(o, gpt.even.tag)
+            return v_obj
+
+        if self.max_bytes > 0:
+            self.stats["miss"] += 1
+        return [cgpt.create_lattice(grid.obj, t, grid.precision) for t in otype.v_otype]
+
+    def release(self, grid, otype, v_obj):
+        nbytes = self.rank_bytes(grid, otype)
+        if self.max_bytes <= 0 or nbytes > self.max_bytes:
+            for o in v_obj:
+                cgpt.delete_lattice(o)
+            return
+
+        # keep a reference to grid such that it outlives the pooled memory
+        key = (grid.obj, otype.__name__)
+        if key not in self.free:
+            self.free[key] = []
+        self.free[key].append((grid, v_obj, nbytes))
+        self.free.move_to_end(key)
+        self.bytes += nbytes
+        self.stats["peak_bytes"] = max(self.stats["peak_bytes"], self.bytes)
+
+        # evict least recently used size classes beyond high-water mark
+        while self.bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        key = next(iter(self.free))
+        entries = self.free[key]
+        grid_ref, v_obj, nbytes = entries.pop(0)
+        if len(entries) == 0:
+            del self.free[key]
+        self.bytes -= nbytes
+        self.stats["evict"] += 1
+        for o in v_obj:
+            cgpt.delete_lattice(o)
+
+    def clear(self):
+        while len(self.free) > 0:
+            self.evict()
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        while self.bytes > self.max_bytes:
+            self.evict()
+
+
+pool = lattice_pool(lattice_pool_max_gb * 1024.0 ** 3.0)
+
+
+def get_lattice_pool():
+    return pool
+
+
+# least recently used copy plans of a single kind
+class copy_plan_lru:
+    def __init__(self):
+        self.plans = collections.OrderedDict()  # least recently used first
+        self.bytes = 0
+
+    def set(self, key, value, nbytes):
+        if key in self.plans:
+            self.bytes -= self.plans[key][3]
+        self.plans[key] = (*value, nbytes)
+        self.plans.move_to_end(key)
+        self.bytes += nbytes
+
+    def evict(self):
+        self.bytes -= self.plans.popitem(last=False)[1][3]
+
+    def clear(self):
+        self.plans.clear()
+        self.bytes = 0
+
+
+# least recently used copy plans of lattice get/set, bounded in number and
+# in the memory per rank held by their block tables and communication buffers
+#
+# Plans of local coordinates are created without communication and are
+# kept per rank.  Plans of global coordinates are created collectively;
+# accesses with global coordinates are collective, such that these plans
+# are inserted and evicted in the same order on all ranks and their size
+# is averaged over ranks, i.e., hits and misses agree without communication
+# as long as all ranks repeat their accesses in the same pattern.
+class copy_plan_cache:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.local = copy_plan_lru()
+        self.collective = copy_plan_lru()
+        self.last_key = None
+        self.stats = {"hit": 0, "miss": 0, "evict": 0}
+
+    def __len__(self):
+        return len(self.local.plans) + len(self.collective.plans)
+
+    @property
+    def bytes(self):
+        return self.local.bytes + self.collective.bytes
+
+    def plan_bytes(self, xp):
+        # two offsets per block and buffers for data of other ranks
+        nbytes = 0
+        for (dst_rank, src_rank), indices in xp.info().items():
+            for a in indices.values():
+                nbytes += 16 * a["blocks"]
+                if dst_rank != src_rank:
+                    nbytes += a["size"]
+        return nbytes
+
+    def key(self, tag, l, pos, tidx, fingerprint=None):
+        if fingerprint is None:
+            h = hashlib.blake2b(digest_size=16)
+            if isinstance(pos, gpt.coordinate_runs):
+                h.update(b"runs")
+                pos = pos.runs
+            for a in [pos, tidx]:
+                a = numpy.ascontiguousarray(a)
+                h.update(f"{a.dtype.str}{a.shape}".encode("utf-8"))
+                h.update(memoryview(a).cast("B"))
+            fingerprint = h.digest()
+        return (
+            tag,
+            l.grid.obj,
+            l.otype.__name__,
+            l.checkerboard().__name__,
+            gpt.is_local_coordinates(pos),
+            fingerprint,
+        )
+
+    def entries(self, key):
+        return self.local if key[4] else self.collective
+
+    def get(self, grid, key):
+        plans = self.entries(key).plans
+        if key in plans:
+            plans.move_to_end(key)
+            self.last_key = key
+            self.stats["hit"] += 1
+            return plans[key][1]
+
+        self.stats["miss"] += 1
+        return None
+
+    def set(self, grid, key, xp, optimized=True):
+        nbytes = self.plan_bytes(xp)
+        if not key[4] and grid.Nprocessors > 1:
+            nbytes = grid.globalsum(float(nbytes)) / grid.Nprocessors
+        # keep a reference to grid such that key stays unique
+        self.entries(key).set(key, (grid, xp, optimized), nbytes)
+        self.last_key = key
+        self.shrink()
+
+    def optimized(self, key):
+        return self.entries(key).plans[key][2]
+
+    def most_recent(self):
+        return self.last_key
+
+    def shrink(self):
+        for e in [self.local, self.collective]:
+            while len(e.plans) > self.max_entries or e.bytes > self.max_bytes:
+                e.evict()
+                self.stats["evict"] += 1
+
+    # the following need to be called on all ranks
+    def clear(self):
+        self.local.clear()
+        self.collective.clear()
+
+    def set_max_entries(self, max_entries):
+        self.max_entries = max_entries
+        self.shrink()
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.shrink()
+
+
+plan_cache = copy_plan_cache(
+    copy_plan_cache_size, copy_plan_cache_max_gb * 1024.0 ** 3.0
+)
+
+
+def get_copy_plan_cache():
+    return plan_cache
+
+
+# resolved keys of single-site access l[x,y,z,t,...]
+site_cache = collections.OrderedDict()  # least recently used first
+site_cache_size = 1024
+
+
+def map_site_key(l, key):
+    if (
+        type(key) != tuple
+        or len(key) < l.grid.nd
+        or not all([isinstance(k, (int, numpy.integer)) for k in key])
+    ):
+        return None
+
+    key = tuple([int(k) for k in key])
+    k = (l.grid.obj, l.otype.__name__, l.checkerboard().__name__, key)
+    if k in site_cache:
+        site_cache.move_to_end(k)
+        return site_cache[k][1:]
+
+    # keep a reference to grid such that key stays unique
+    pos, tidx, shape = gpt.map_key(l, key)
+    site_cache[k] = (l.grid, pos, tidx, shape, ("site",) + key)
+    while len(site_cache) > site_cache_size:
+        site_cache.popitem(last=False)
+    return site_cache[k][1:]
+
+
+def map_key_cached(l, key, cache_key):
+    # returns pos, tidx, shape, and fingerprint for plan cache
+    if cache_key is None:
+        site = map_site_key(l, key)
+        if site is not None:
+            return site
+    return (*gpt.map_key(l, key), None)
+
+
 class lattice_view_constructor:
     def __init__(self, parent):
         self.parent = parent
@@ -49,6 +303,23 @@ def unpack_cache_key(key):
     return None, key
 
 
+def lookup_plan(grid, cache, cache_key):
+    if cache_key is None:
+        return None
+    elif isinstance(cache, copy_plan_cache):
+        return cache.get(grid, cache_key)
+    return cache.get(cache_key)
+
+
+def store_plan(grid, cache, cache_key, xp, optimized=True):
+    if cache_key is None:
+        return
+    elif isinstance(cache, copy_plan_cache):
+        cache.set(grid, cache_key, xp, optimized)
+    else:
+        cache[cache_key] = xp
+
+
 # lattice class
 class lattice(factor):
     __array_priority__ = 1000000
@@ -64,27 +335,18 @@ class lattice(factor):
                 p = second.split(";")
                 self.otype = gpt.str_to_otype(p[0])
                 cb = gpt.str_to_cb(p[1])
-                self.v_obj = [
-                    cgpt.create_lattice(self.grid.obj, t, self.grid.precision)
-                    for t in self.otype.v_otype
-                ]
+                self.v_obj = pool.allocate(self.grid, self.otype)
             else:
                 self.otype = second
                 if third is not None:
                     self.v_obj = third
                 else:
-                    self.v_obj = [
-                        cgpt.create_lattice(self.grid.obj, t, self.grid.precision)
-                        for t in self.otype.v_otype
-                    ]
+                    self.v_obj = pool.allocate(self.grid, self.otype)
         elif type(first) == gpt.lattice:
             # Note that copy constructor only creates a compatible lattice but does not copy its contents!
             self.grid = first.grid
             self.otype = first.otype
-            self.v_obj = [
-                cgpt.create_lattice(self.grid.obj, t, self.grid.precision)
-                for t in self.otype.v_otype
-            ]
+            self.v_obj = pool.allocate(self.grid, self.otype)
             cb = first.checkerboard()
         else:
             raise Exception("Unknown lattice constructor")
@@ -101,8 +363,7 @@ class lattice(factor):
 
     def __del__(self):
         del mem_book[self.v_obj[0]]
-        for o in self.v_obj:
-            cgpt.delete_lattice(o)
+        pool.release(self.grid, self.otype, self.v_obj)
 
     def swap(self, other):
         assert self.grid == other.grid
@@ -166,7 +427,7 @@ class lattice(factor):
             cache = lattice.cache
 
         # general code path, map key
-        pos, tidx, shape = gpt.map_key(self, key)
+        pos, tidx, shape, fingerprint = map_key_cached(self, key, cache_key)
         n_pos = len(pos)
 
         # convert input to proper numpy array
@@ -178,8 +439,21 @@ class lattice(factor):
         nbytes_needed = n_pos * numpy.prod(shape) * self.grid.precision.nbytes * 2
         value = cgpt.copy_cyclic_upscale(value, nbytes_needed)
 
-        # create plan
-        if cache_key is None or cache_key not in cache:
+        # automatic plan cache, plan depends on whether this rank provides data
+        if cache_key is None and plan_cache.max_entries > 0:
+            cache_key = plan_cache.key(
+                ("set", value.nbytes > 0), self, pos, tidx, fingerprint
+            )
+            cache = plan_cache
+
+        # create plan, plans of the automatic cache are only optimized once
+        # they are used a second time
+        xp = lookup_plan(self.grid, cache, cache_key)
+        skip_optimize = cache_key is None or cache is plan_cache
+        if xp is not None and cache is plan_cache and not cache.optimized(cache_key):
+            xp = None
+            skip_optimize = False
+        if xp is None:
             plan = gpt.copy_plan(self, value)
             plan.destination += gpt.lattice_view(self, pos, tidx)
             plan.source += gpt.global_memory_view(
@@ -191,13 +465,10 @@ class lattice(factor):
 
             # skip optimization if we only use it once
             xp = plan(
-                local_only=isinstance(pos, gpt.core.local_coordinates),
-                skip_optimize=cache_key is None,
+                local_only=gpt.is_local_coordinates(pos),
+                skip_optimize=skip_optimize,
             )
-            if cache_key is not None:
-                cache[cache_key] = xp
-        else:
-            xp = cache[cache_key]
+            store_plan(self.grid, cache, cache_key, xp, not skip_optimize)
 
         xp(self, value)
 
@@ -208,14 +479,20 @@ class lattice(factor):
         cache_key = None if cache is None else "get"
 
         # general code path, map key
-        pos, tidx, shape = gpt.map_key(self, key)
+        pos, tidx, shape, fingerprint = map_key_cached(self, key, cache_key)
         n_pos = len(pos)
 
+        # automatic plan cache
+        if cache_key is None and plan_cache.max_entries > 0:
+            cache_key = plan_cache.key("get", self, pos, tidx, fingerprint)
+            cache = plan_cache
+
         # create target
         value = cgpt.ndarray((n_pos, *shape), self.grid.precision.complex_dtype)
 
         # create plan
-        if cache_key is None or cache_key not in cache:
+        xp = lookup_plan(self.grid, cache, cache_key)
+        if xp is None:
             plan = gpt.copy_plan(value, self)
             plan.destination += gpt.global_memory_view(
                 self.grid,
@@ -224,12 +501,8 @@ class lattice(factor):
                 else None,
             )
             plan.source += gpt.lattice_view(self, pos, tidx)
-            xp = plan()
-
-            if cache_key is not None:
-                cache[cache_key] = xp
-        else:
-            xp = cache[cache_key]
+            xp = plan(local_only=gpt.is_local_coordinates(pos))
+            store_plan(self.grid, cache, cache_key, xp)
 
         xp(value, self)
 
@@ -240,6 +513,22 @@ class lattice(factor):
 
         return value
 
+    def peek_many(self, sites):
+        # values at list of sites in one collective operation
+        pos = numpy.array(sites, dtype=numpy.int32).reshape((-1, self.grid.nd))
+        value = self[pos]
+        return [gpt.util.value_to_tensor(v, self.otype) for v in value]
+
+    def poke_many(self, sites, values):
+        # set values at list of sites in one collective operation
+        pos = numpy.array(sites, dtype=numpy.int32).reshape((-1, self.grid.nd))
+        assert len(values) == len(pos)
+        dtype = self.grid.precision.complex_dtype
+        value = numpy.zeros((len(pos),) + tuple(self.otype.shape), dtype=dtype)
+        for i, v in enumerate(values):
+            value[i] = gpt.util.tensor_to_value(v, dtype=dtype)
+        self[pos] = value
+
     def mview(self, location=host):
         return [cgpt.lattice_memory_view(self, o, location) for o in self.v_obj]
 
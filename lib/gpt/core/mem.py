@@ -126,6 +126,48 @@ def mem_report(details=True):
     )
     gpt.message(" %-39s %g GB" % ("Lattice fields on all ranks", g_tot_gb))
     gpt.message(" %-39s %g GB" % ("Lattice fields per rank", l_tot_gb))
+    pool = gpt.get_lattice_pool()
+    if pool.max_bytes > 0:
+        gpt.message(
+            " %-39s %g GB (peak %g GB, limit %g GB)"
+            % (
+                "Lattice pool per rank",
+                pool.bytes / 1024 ** 3.0,
+                pool.stats["peak_bytes"] / 1024 ** 3.0,
+                pool.max_bytes / 1024 ** 3.0,
+            )
+        )
+        gpt.message(
+            " %-39s %d hits, %d misses, %d evictions"
+            % (
+                "Lattice pool statistics",
+                pool.stats["hit"],
+                pool.stats["miss"],
+                pool.stats["evict"],
+            )
+        )
+    plan_cache = gpt.get_copy_plan_cache()
+    if plan_cache.max_entries > 0:
+        n = plan_cache.stats["hit"] + plan_cache.stats["miss"]
+        gpt.message(
+            " %-39s %d hits (%.1f%%), %d misses, %d evictions, %d plans"
+            % (
+                "Copy plan cache statistics",
+                plan_cache.stats["hit"],
+                100.0 * plan_cache.stats["hit"] / max(n, 1),
+                plan_cache.stats["miss"],
+                plan_cache.stats["evict"],
+                len(plan_cache),
+            )
+        )
+        gpt.message(
+            " %-39s %g GB (limit %g GB)"
+            % (
+                "Copy plan cache per rank",
+                plan_cache.bytes / 1024 ** 3.0,
+                plan_cache.max_bytes / 1024 ** 3.0,
+            )
+        )
     gpt.message(
         " %-39s %g GB" % ("Resident memory per rank", info["maxrss"] / 1024 ** 3.0)
     )
@@ -74,8 +74,8 @@ def map_pos(grid, cb, key):
 
     # slices without specified start/stop corresponds to memory view limitation for this rank
     if all([k == slice(None, None, None) for k in key]):
-        # go through gpt.coordinates to use its caching feature
-        return gpt.coordinates((grid, cb), order="lexicographic")
+        # cached compact representation
+        return gpt.core.local_coordinate_runs(grid, cb)
 
     nd = grid.nd
     key = tuple([k if type(k) == slice else slice(k, k + 1) for k in key])
@@ -99,8 +99,8 @@ def map_pos(grid, cb, key):
         ]
     )
 
-    return cgpt.coordinates_from_cartesian_view(
-        top, bottom, grid.cb.cb_mask, cb.tag, "lexicographic"
+    return gpt.coordinate_runs.from_cartesian_view(
+        top, bottom, grid.cb.cb_mask, cb.tag, grid.fdimensions, False
     )
 
 
@@ -19,6 +19,38 @@
 import gpt, cgpt, numpy, sys
 from gpt.params import params_convention
 
+# Philox4x32-10 counter-based generator used for per-site sampling
+philox_m = (0xD2511F53, 0xCD9E8D57)
+philox_w = (0x9E3779B9, 0xBB67AE85)
+
+
+def philox4x32(c, k):
+    # c are four arrays of uint64 holding 32-bit counter words, k two 32-bit keys
+    u = numpy.uint64
+    mask = u(0xFFFFFFFF)
+    c0, c1, c2, c3 = c
+    k0, k1 = k
+    for r in range(10):
+        p0 = u(philox_m[0]) * c0
+        p1 = u(philox_m[1]) * c2
+        c0, c1, c2, c3 = (
+            (p1 >> u(32)) ^ c1 ^ u(k0),
+            p1 & mask,
+            (p0 >> u(32)) ^ c3 ^ u(k1),
+            p0 & mask,
+        )
+        k0 = (k0 + philox_w[0]) & 0xFFFFFFFF
+        k1 = (k1 + philox_w[1]) & 0xFFFFFFFF
+    return c0, c1, c2, c3
+
+
+def uniform53(a, b):
+    # uniform in [0,1[ from two 32-bit words
+    u = numpy.uint64
+    return ((a >> u(5)) * u(67108864) + (b >> u(6))).astype(numpy.float64) / float(
+        2 ** 53
+    )
+
 
 class random:
     def __init__(self, first, second=None):
@@ -32,6 +64,15 @@ class random:
             if engine is None:
                 engine = "vectorized_ranlux24_389_64"
 
+        self.seed = s
+        self.engine = engine
+
+        # per-site streams are keyed by the seed and indexed by global site,
+        # number of draw, and tensor component
+        key = sha256(memoryview(str(s).encode("utf-8")))
+        self.site_key = (key & 0xFFFFFFFF, (key >> 32) & 0xFFFFFFFF)
+        self.site_draw = 0
+
         self.verbose = gpt.default.is_verbose("random")
         self.verbose_performance = gpt.default.is_verbose("random_performance")
         t0 = gpt.time()
@@ -46,11 +87,67 @@ class random:
     def __del__(self):
         cgpt.delete_random(self.obj)
 
+    def substream(self, tag):
+        # independent generator derived from seed and tag
+        seed = sha256(memoryview(f"{self.seed}\0{tag}".encode("utf-8")))
+        return random("%064x" % seed, self.engine)
+
+    def skip(self, n):
+        # per-site sampling continues as if n draws had been made
+        self.site_draw += n
+
+    def sample_sites(self, t, p):
+        # Each site draws from its own stream determined by its global
+        # coordinate, such that cost is proportional to the number of sites
+        # sampled and results do not depend on the MPI layout.  All ranks need
+        # to take part to keep the number of draws consistent.
+        pos = p["coordinates"]
+        fdimensions = t.grid.fdimensions
+        u = numpy.uint64
+
+        site = numpy.zeros((len(pos),), dtype=numpy.uint64)
+        stride = 1
+        for mu in range(len(fdimensions)):
+            site += pos[:, mu].astype(numpy.uint64) * u(stride)
+            stride *= fdimensions[mu]
+
+        ncomponent = int(numpy.prod(t.otype.shape))
+        site = numpy.repeat(site, ncomponent)
+        component = numpy.tile(numpy.arange(ncomponent, dtype=numpy.uint64), len(pos))
+        draw = numpy.full(site.shape, self.site_draw & 0xFFFFFFFF, dtype=numpy.uint64)
+        self.site_draw += 1
+
+        w = philox4x32(
+            (site & u(0xFFFFFFFF), site >> u(32), draw, component), self.site_key
+        )
+        x, y = uniform53(w[0], w[1]), uniform53(w[2], w[3])
+
+        dist = p["distribution"]
+        if dist in ["normal", "cnormal"]:
+            r = numpy.sqrt(-2.0 * numpy.log(1.0 - x)) * p["sigma"]
+            v = r * numpy.cos(2.0 * numpy.pi * y) + p["mu"]
+            if dist == "cnormal":
+                v = v + 1j * (r * numpy.sin(2.0 * numpy.pi * y) + p["mu"])
+        elif dist == "uniform_real":
+            v = x * (p["max"] - p["min"]) + p["min"]
+        elif dist == "uniform_int":
+            v = numpy.floor(x * (p["max"] - p["min"] + 1)) + p["min"]
+        elif dist == "zn":
+            v = numpy.exp(2j * numpy.pi * numpy.floor(x * p["n"]) / p["n"])
+        else:
+            raise Exception(f"Unknown distribution: {dist}")
+
+        t[pos] = v.astype(numpy.complex128).reshape((len(pos),) + tuple(t.otype.shape))
+        return t
+
     def sample(self, t, p):
         if type(t) == list:
             for x in t:
                 self.sample(x, p)
             return t
+        elif "coordinates" in p:
+            assert type(t) == gpt.lattice
+            return self.sample_sites(t, p)
         elif t is None:
             return cgpt.random_sample(self.obj, p)
         elif type(t) == gpt.lattice:
@@ -65,9 +162,6 @@ class random:
             t1 = gpt.time()
             assert "pos" not in p  # to ensure that deprecated code is not used
 
-            # optimize memory mapping
-            t.swap(gpt.copy(t))
-
             if self.verbose_performance:
                 szGB = t.global_bytes() / 1024.0 ** 3.0
                 gpt.message(
@@ -18,6 +18,42 @@
 #
 import cgpt, gpt, numpy
 
+eval_scope_stack = []
+
+
+class eval_scope:
+    # with gpt.eval_scope():
+    #     ...
+    #
+    # Within the scope, cshifts of the same lattice (or of its adjoint, ...)
+    # by the same displacement are computed only once.  The shifted fields are
+    # identified by the id of their constituents, so neither the inputs nor the
+    # returned fields may be modified in place before the scope is left.
+    def __init__(self):
+        self.cache = {}
+        self.hits = 0
+
+    def __enter__(self):
+        eval_scope_stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        eval_scope_stack.pop()
+        self.cache = {}
+
+
+def get_identity_key(e):
+    # only single fields or their adjoints etc. are likely to be shifted repeatedly,
+    # products are not cached to limit the memory footprint of a scope
+    if type(e) == gpt.lattice:
+        return id(e)
+    elif type(e) == gpt.expr and len(e.val) == 1 and len(e.val[0][1]) == 1:
+        coef, term = e.val[0]
+        unary, f = term[0]
+        if type(f) == gpt.lattice:
+            return (e.unary, coef, unary, id(f))
+    return None
+
 
 def cshift(first, second, third, fourth=None):
 
@@ -31,11 +67,25 @@ def cshift(first, second, third, fourth=None):
         d = third
         o = fourth
     else:
+        key = None
+        if len(eval_scope_stack) > 0:
+            scope = eval_scope_stack[-1]
+            key = get_identity_key(first)
+            if key is not None:
+                key = (key, second, third)
+                if key in scope.cache:
+                    scope.hits += 1
+                    return scope.cache[key][1]
+
         l = gpt.eval(first)
         d = second
         o = third
         t = gpt.lattice(l)
 
+        if key is not None:
+            # keep first alive such that the ids in key remain unique
+            scope.cache[key] = (first, t)
+
     for i in t.otype.v_idx:
         cgpt.cshift(t.v_obj[i], l.v_obj[i], d, o)
     return t
@@ -67,13 +67,18 @@ get = get_single
 # IO parameters
 max_io_nodes = get_int("--max_io_nodes", 256)
 
+# memory parameters
+lattice_pool_max_gb = get_float("--lattice_pool_max_gb", 0.0)
+copy_plan_cache_size = get_int("--copy_plan_cache_size", 32)
+copy_plan_cache_max_gb = get_float("--copy_plan_cache_max_gb", 1.0)
+
 # verbosity
 verbose_default = (
     "io,bicgstab,cg,defect_correcting,fgcr,fgmres,mr,irl,repository,arnoldi,power_iteration,"
     + "checkpointer,modes,block_operator,random,split,coarse_grid,"
     + "coarsen,qis_map,metropolis,su2_heat_bath,u1_heat_bath"
 )
-verbose_additional = "eval,merge,orthogonalize,copy_plan"
+verbose_additional = "eval,merge,orthogonalize,copy_plan,transport"
 verbose = set()
 verbose_candidates = ",".join(
     sorted((verbose_default + "," + verbose_additional).split(","))
@@ -185,6 +190,24 @@ def process_flags():
  --max_io_nodes n
 
    Set maximal number of simultaneous IO nodes.
+
+ --lattice_pool_max_gb x
+
+   Keep up to x GB per rank of released lattice memory
+   for re-use by new lattices of the same grid and type.
+   The default value of 0 disables the pool.
+
+ --copy_plan_cache_size n
+
+   Keep up to n copy plans of lattice get/set operations
+   for re-use when the same coordinates are accessed again.
+   A value of 0 disables the cache.
+
+ --copy_plan_cache_max_gb x
+
+   Keep copy plans of lattice get/set operations only up to
+   x GB per rank of block tables and communication buffers.
+   The default value is 1 GB.
 """
         )
         sys.exit(0)
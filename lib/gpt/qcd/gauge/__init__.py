@@ -18,7 +18,7 @@
 #
 from gpt.qcd.gauge.create import random, unit
 from gpt.qcd.gauge.transport import path, transport
-from gpt.qcd.gauge.loops import plaquette, rectangle, field_strength
+from gpt.qcd.gauge.loops import plaquette, rectangle, field_strength, wilson_loops
 from gpt.qcd.gauge.staples import staple, staple_sum
 from gpt.qcd.gauge.transformation import transformed
 import gpt.qcd.gauge.smear
@@ -19,8 +19,12 @@
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 import gpt as g
+import numpy as np
+from gpt.params import params_convention
 
+# transports keep their buffers, only the most recently used are kept
 default_rectangle_cache = {}
+default_rectangle_cache_size = 4
 
 
 def rectangle(U, first, second=None, third=None, cache=default_rectangle_cache):
@@ -58,7 +62,7 @@ def rectangle(U, first, second=None, third=None, cache=default_rectangle_cache):
             else:
                 configurations.append(f)
 
-    cache_key = str(configurations)
+    cache_key = f"{U[0].grid.describe()}_{U[0].otype.__name__}_{configurations}"
     if cache_key not in cache:
         paths = []
         elements = []
@@ -70,11 +74,17 @@ def rectangle(U, first, second=None, third=None, cache=default_rectangle_cache):
             elements.append(len(c_paths))
             paths = paths + c_paths
         cache[cache_key] = (g.qcd.gauge.transport(U, paths), elements)
+        if cache is default_rectangle_cache:
+            while len(cache) > default_rectangle_cache_size:
+                del cache[next(iter(cache))]
+    else:
+        # move to end of insertion order
+        cache[cache_key] = cache.pop(cache_key)
 
     transport = cache[cache_key][0]
     ranges = cache[cache_key][1]
 
-    loops = transport(U)
+    traces = transport.trace_sum(U)
 
     vol = float(U[0].grid.fsites)
     ndim = U[0].otype.shape[0]
@@ -83,8 +93,8 @@ def rectangle(U, first, second=None, third=None, cache=default_rectangle_cache):
     idx = 0
     ridx = 0
     results = []
-    for p in loops:
-        value += g.sum(g.trace(p))
+    for tr in traces:
+        value += tr
         idx += 1
         if idx == ranges[ridx]:
             results.append(value.real / vol / idx / ndim)
@@ -96,6 +106,79 @@ def rectangle(U, first, second=None, third=None, cache=default_rectangle_cache):
     return results
 
 
+@params_convention(T=None, time_direction=None, polyakov=False)
+def wilson_loops(U, shapes, params):
+    #
+    # Calling conventions:
+    #
+    # W = wilson_loops(U, [g.qcd.gauge.path().f(0, 2), g.qcd.gauge.path().f(0, 1).f(1, 1)], T=4)
+    # W, P = wilson_loops(U, shapes, polyakov=True)
+    #
+    # Each spatial shape s is closed by temporal lines of extent T = 1, ..., params["T"]
+    # (default L_t // 2).  W[i][T - 1, t] is the real part of the normalized trace of
+    # the loop with spatial shape i and temporal extent T, averaged over all
+    # loops with lower temporal edge in time slice t.  P is the average Polyakov loop.
+    #
+    nd = len(U)
+    time_direction = params["time_direction"]
+    if time_direction is None:
+        time_direction = nd - 1
+    L_t = U[0].grid.fdimensions[time_direction]
+    T = params["T"]
+    if T is None:
+        T = L_t // 2
+    polyakov = params["polyakov"]
+
+    # spatial transporters S of the shapes and their displacements R
+    for s in shapes:
+        assert all([mu != time_direction for mu, distance in s.path])
+    S = [g.copy(x) for x in g.qcd.gauge.transport(U, shapes)(U)]
+    R = []
+    for s in shapes:
+        d = [0] * nd
+        for mu, distance in s.path:
+            d[mu] += distance
+        R.append(d)
+
+    # the temporal line L(x) = U_t(x) ... U_t(x + (T-1) t) and the shifted
+    # S(x + T t) are extended by one step per T, such that memory does not
+    # grow with T;  W = tr(S(x) L(x + R) adj(S(x + T t)) adj(L(x)))
+    vol3 = float(U[0].grid.fsites) / L_t
+    ndim = U[0].otype.shape[0]
+
+    U_t = U[time_direction]
+    U_shifted = U_t
+    L = g.copy(U_t)
+    S_shifted = S
+    W = [np.zeros((T, L_t), dtype=np.float64) for s in shapes]
+    for t in range(1, T + 1):
+        if t > 1:
+            U_shifted = g.cshift(U_shifted, time_direction, 1)
+            L = g.eval(L * U_shifted)
+        S_shifted = [g.cshift(x, time_direction, 1) for x in S_shifted]
+        for i in range(len(shapes)):
+            L_R = L
+            for mu in range(nd):
+                if R[i][mu] != 0:
+                    L_R = g.cshift(L_R, mu, R[i][mu])
+            tr = g.slice(
+                g.trace(S[i] * L_R * g.adj(S_shifted[i]) * g.adj(L)), time_direction
+            )
+            W[i][t - 1] = np.array(tr, dtype=np.complex128).real / vol3 / ndim
+
+    if polyakov:
+        # product of shifted links, avoids keeping L_t shifted copies of U
+        U_t = U[time_direction]
+        P = g.copy(U_t)
+        U_shifted = U_t
+        for t in range(1, L_t):
+            U_shifted = g.cshift(U_shifted, time_direction, 1)
+            P = g.eval(P * U_shifted)
+        P = complex(g.sum(g.trace(P))) / vol3 / L_t / ndim
+        return W, P
+    return W
+
+
 def plaquette(U):
     # U[mu](x)*U[nu](x+mu)*adj(U[mu](x+nu))*adj(U[nu](x))
     tr = 0.0
@@ -118,10 +201,11 @@ def plaquette(U):
 def field_strength(U, mu, nu):
     assert mu != nu
     # v = staple_up - staple_down
-    v = g.eval(
-        g.cshift(U[nu], mu, 1) * g.adj(g.cshift(U[mu], nu, 1)) * g.adj(U[nu])
-        - g.cshift(g.adj(g.cshift(U[nu], mu, 1)) * g.adj(U[mu]) * U[nu], nu, -1)
-    )
+    with g.eval_scope():
+        v = g.eval(
+            g.cshift(U[nu], mu, 1) * g.adj(g.cshift(U[mu], nu, 1)) * g.adj(U[nu])
+            - g.cshift(g.adj(g.cshift(U[nu], mu, 1)) * g.adj(U[mu]) * U[nu], nu, -1)
+        )
 
     F = g.eval(U[mu] * v + g.cshift(v * U[mu], mu, -1))
     F @= 0.125 * (F - g.adj(F))
@@ -38,12 +38,14 @@ def staple_sum(U, params):
     assert rho is not None
     assert rho.shape == (nd, nd)
     U_prime = []
-    for mu in range(nd):
-        U_mu_prime = g.lattice(U[mu])
-        U_mu_prime[:] = 0
-        for nu in range(nd):
-            if mu != nu:
-                if abs(rho[mu, nu]) != 0.0:
-                    U_mu_prime += rho[mu, nu] * staple(U, mu, nu)
-        U_prime.append(U_mu_prime)
+    # staples for different mu share shifted links
+    with g.eval_scope():
+        for mu in range(nd):
+            U_mu_prime = g.lattice(U[mu])
+            U_mu_prime[:] = 0
+            for nu in range(nd):
+                if mu != nu:
+                    if abs(rho[mu, nu]) != 0.0:
+                        U_mu_prime += rho[mu, nu] * staple(U, mu, nu)
+            U_prime.append(U_mu_prime)
     return U_prime
@@ -42,10 +42,44 @@ path.f = path.forward
 path.b = path.backward
 
 
+class path_tree:
+    # prefix tree of link steps; each step is (mu, displacement, forward)
+    def __init__(self):
+        self.children = {}
+        self.ends = []
+        self.buffer = None
+
+    def add(self, steps, index):
+        node = self
+        for step in steps:
+            if step not in node.children:
+                node.children[step] = path_tree()
+            node = node.children[step]
+        node.ends.append(index)
+
+    def uses(self):
+        return len(self.children) + len(self.ends)
+
+    def nodes(self, depth=0):
+        n = 0
+        for child in self.children.values():
+            n += (1 if depth > 0 else 0) + child.nodes(depth + 1)
+        return n
+
+
 class transport:
+    #
+    # Shifted links and the lattices holding the transported paths are
+    # allocated once and re-used by each call.  Results of a previous call
+    # are therefore overwritten by the next call.
+    #
+    # Paths are organized in a prefix tree such that common prefixes,
+    # e.g., of rectangles with shared first legs, are multiplied only once.
+    #
     def __init__(self, links, paths, site_fields=None):
         self.paths = paths
         self.dim = len(links)
+        self.verbose = g.default.is_verbose("transport")
 
         if site_fields is None:
             site_fields = []
@@ -54,31 +88,69 @@ class transport:
 
         link_displacements = [set() for mu in range(self.dim)]
         site_displacements = set()
-        for p in paths:
+        self.tree = path_tree()
+        for i, p in enumerate(paths):
             d = [0] * self.dim
+            steps = []
             for mu, distance in p.path:
                 assert mu >= 0 and mu < self.dim
                 for step in range(abs(distance)):
                     if distance > 0:
                         link_displacements[mu].add(tuple(d))
+                        steps.append((mu, tuple(d), True))
                     d[mu] += distance // abs(distance)
                     if distance < 0:
                         link_displacements[mu].add(tuple(d))
+                        steps.append((mu, tuple(d), False))
+            assert len(steps) > 0
             site_displacements.add(tuple(d))
-
-        plan = g.cshift_plan()
-
-        self.link_indices = []
-        for mu in range(self.dim):
-            self.link_indices.append(plan.add(links[mu], link_displacements[mu]))
-
-        self.site_fields_indices = []
-        for i in range(self.n_site_fields):
-            self.site_fields_indices.append(
-                plan.add(site_fields[i], site_displacements)
+            self.tree.add(steps, i)
+
+        # matrix multiplications per site with and without shared prefixes
+        self.multiplications = self.tree.nodes()
+        self.multiplications_naive = sum(
+            [sum([abs(distance) for mu, distance in p.path]) - 1 for p in paths]
+        )
+        if self.verbose and len(paths) > 0:
+            n = links[0].otype.shape[0]
+            flops = (8 * n ** 3 - 2 * n ** 2) * links[0].grid.gsites
+            g.message(
+                f"Transport of {len(paths)} paths with {self.multiplications} instead of "
+                + f"{self.multiplications_naive} matrix multiplications per site saves "
+                + f"{(self.multiplications_naive - self.multiplications) * flops:g} flops per call"
             )
 
-        self.cshifts = plan()
+        self.cshifts = g.cshift_batch(
+            links + site_fields,
+            link_displacements + [site_displacements] * self.n_site_fields,
+        )
+        self.link_indices = self.cshifts.indices[0 : self.dim]
+        self.site_fields_indices = self.cshifts.indices[self.dim :]
+
+        self.results = [None] * len(paths)
+        self.trace_buffer = None
+
+    def evaluate(self, buffers, node, prefix, path_end):
+        for step, child in node.children.items():
+            mu, d, forward = step
+            factor = buffers[self.link_indices[mu][d]]
+            if not forward:
+                factor = g.adj(factor)
+            e = factor if prefix is None else prefix * factor
+
+            # materialize prefixes that are used more than once, a first
+            # step is a (shifted) link that is referenced directly
+            if child.uses() > 1 and prefix is not None:
+                if child.buffer is None:
+                    child.buffer = g(e)
+                else:
+                    child.buffer @= e
+                e = child.buffer
+
+            for i in child.ends:
+                path_end(i, e)
+
+            self.evaluate(buffers, child, e, path_end)
 
     def __call__(self, links, site_fields=[]):
         assert len(site_fields) == self.n_site_fields
@@ -86,30 +158,43 @@ class transport:
 
         buffers = self.cshifts(links + site_fields)
 
-        for p in self.paths:
-            d = [0 for mu in range(self.dim)]
-            r = None
-            # pr = prof.Profile(timer=lambda: g.time()*100000.0)
-            # pr.enable()
-            for mu, distance in p.path:
-                for step in range(abs(distance)):
-                    factor = None
-                    if distance > 0:
-                        factor = buffers[self.link_indices[mu][tuple(d)]]
-                    d[mu] += distance // abs(distance)
-                    if distance < 0:
-                        factor = g.adj(buffers[self.link_indices[mu][tuple(d)]])
-                    assert factor is not None
-                    if r is None:
-                        r = factor
-                    else:
-                        r = r * factor
-            # pr.disable()
-            # pr.print_stats(sort="cumulative")
-            assert r is not None
-            yield g.eval(r)
+        def path_end(i, e):
+            if self.results[i] is None:
+                # lattices need a copy to not alias the shift and prefix buffers
+                self.results[i] = g.copy(e) if type(e) == g.lattice else g(e)
+            else:
+                self.results[i] @= e
+
+        self.evaluate(buffers, self.tree, None, path_end)
+
+        for i in range(len(self.paths)):
+            yield self.results[i]
 
         for i in range(self.n_site_fields):
             site_fields_indices_i = self.site_fields_indices[i]
             for sfi in site_fields_indices_i:
                 yield (sfi, buffers[site_fields_indices_i[sfi]])
+
+    def trace_sum(self, links, dimension=None):
+        # stream each path into the sum of its trace over the lattice
+        # (or over slices orthogonal to dimension) without keeping the
+        # transported matrix field
+        assert len(links) == self.dim
+        assert self.n_site_fields == 0
+
+        buffers = self.cshifts(links)
+
+        results = [None] * len(self.paths)
+
+        def path_end(i, e):
+            if self.trace_buffer is None:
+                self.trace_buffer = g(g.trace(e))
+            else:
+                self.trace_buffer @= g.trace(e)
+            if dimension is None:
+                results[i] = g.sum(self.trace_buffer)
+            else:
+                results[i] = g.slice(self.trace_buffer, dimension)
+
+        self.evaluate(buffers, self.tree, None, path_end)
+        return results
@@ -183,6 +183,20 @@ dst = g.cshift(src, 0, 1)
 # dst[x] = src[x+1] -> src[0] == dst[15]
 assert abs(dst[15, 0, 0, 0] - complex(2, 1)) < 1e-6
 
+# batch of cshifts with persistent buffers
+batch = g.cshift_batch([src, l_sp], [[(1, 0, 0, 0)], [(0, -1, 0, 0), (0, 0, 2, 0)]])
+buffers = batch([src, l_sp])
+for i in range(2):
+    assert batch([src, l_sp])[0] is buffers[0]
+    for x, ref in [
+        (batch[0, (1, 0, 0, 0)], g.cshift(src, 0, 1)),
+        (batch[1, (0, -1, 0, 0)], g.cshift(l_sp, 1, -1)),
+        (batch[1, (0, 0, 2, 0)], g.cshift(l_sp, 2, 2)),
+    ]:
+        eps2 = g.norm2(x - ref)
+        assert eps2 == 0.0
+    rng.cnormal(l_sp)
+
 ################################################################################
 # Test multi inner_product
 ################################################################################
@@ -299,6 +313,97 @@ eps = g.norm2((b < a) - (a > b)) ** 0.5
 g.message(f"Test a < b compatible with b > a: {eps}")
 assert eps == 0.0
 
+################################################################################
+# Test lattice pool
+################################################################################
+pool = g.get_lattice_pool()
+pool_max_bytes = pool.max_bytes
+pool.set_max_bytes(1024 ** 3)
+hits = pool.stats["hit"]
+a = g.mcolor(grid_dp)
+obj = a.v_obj[0]
+del a
+assert pool.bytes > 0
+b = g.mcolor(grid_dp)
+assert b.v_obj[0] == obj and pool.stats["hit"] == hits + 1
+del b
+g.mem_report(details=False)
+pool.set_max_bytes(pool_max_bytes)
+assert pool.bytes <= pool_max_bytes
+
+################################################################################
+# Test copy plan cache
+################################################################################
+plan_cache = g.get_copy_plan_cache()
+a = rng.cnormal(g.vcolor(grid_dp))
+b = g.vcolor(grid_dp)
+b[:] = 0
+pos = g.coordinates(a)
+pos = pos[pos[:, 0] == 1]
+hits = plan_cache.stats["hit"]
+for i in range(3):
+    b[pos] = a[pos]
+assert plan_cache.stats["hit"] == hits + 4
+# set plans are only optimized once they are re-used
+v = a[pos[0:4]]
+for optimized in [False, True]:
+    b[pos[0:4]] = v
+    assert plan_cache.optimized(plan_cache.most_recent()) == optimized
+    assert plan_cache.most_recent() in plan_cache.local.plans
+assert np.array_equal(b[pos], a[pos])
+g.message(f"Test copy plan cache: {plan_cache.stats}")
+# memory held by plans is bounded
+assert plan_cache.bytes > 0
+plan_cache_max_bytes = plan_cache.max_bytes
+plan_cache.set_max_bytes(0)
+assert len(plan_cache) == 0 and plan_cache.bytes == 0
+plan_cache.set_max_bytes(plan_cache_max_bytes)
+
+################################################################################
+# Test cached peek/poke and batched site access
+################################################################################
+sites = [[0, 1, 2, 3], [3, 2, 1, 0], [1, 1, 1, 1]]
+values = a.peek_many(sites)
+hits = plan_cache.stats["hit"]
+for j in range(2):  # second pass uses cached sites and plans
+    for i, x in enumerate(sites):
+        assert np.array_equal(values[i].array, a[tuple(x)].array)
+assert plan_cache.stats["hit"] >= hits + len(sites)
+b[:] = 0
+b.poke_many(sites, values)
+assert abs(g.norm2(b) - sum([g.norm2(v) for v in values])) < 1e-12
+for i, x in enumerate(sites):
+    b[tuple(x)] = values[(i + 1) % len(values)]
+    assert np.array_equal(b[tuple(x)].array, values[(i + 1) % len(values)].array)
+
+################################################################################
+# Test compact coordinate runs
+################################################################################
+grid_rb = grid_dp.checkerboarded(g.redblack)
+for grid, cb in [(grid_dp, g.none), (grid_rb, g.even), (grid_rb, g.odd)]:
+    runs = g.local_coordinate_runs(grid, cb)
+    assert runs is g.local_coordinate_runs(grid, cb)
+    assert g.is_local_coordinates(runs)
+    assert np.array_equal(runs.expand(), g.coordinates((grid, cb)))
+    pos = g.coordinates((grid, cb))
+    assert np.array_equal(
+        g.coordinate_runs.from_coordinates(pos, grid.fdimensions).runs, runs.runs
+    )
+assert len(g.local_coordinate_runs(grid_dp, g.none).runs) == 1
+
+# cached coordinates are shared and read-only
+pos = g.coordinates(grid_dp)
+assert pos is g.coordinates(grid_dp)
+try:
+    pos[0, 0] = 1
+    assert False
+except ValueError:
+    pass
+b[:] = 0
+b[:, :, :, 1] = a[:, :, :, 1]
+assert np.array_equal(b[:, :, :, 1], a[:, :, :, 1])
+assert np.all(b[:, :, :, 0] == 0.0)
+
 ################################################################################
 # Test mem_report
 ################################################################################
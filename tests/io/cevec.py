@@ -67,6 +67,15 @@ for mpi_layout in [[1, 1, 1, 1, 1], [1, 2, 2, 2, 2]]:
     for i in range(len(feval)):
         assert (feval[i] - feval2[i]) ** 2.0 < 1e-25
 
+    # stream one block at a time from the memory-mapped file
+    basis3, cevec3, feval3 = g.load(
+        f"{work_dir}/cevec", {"grids": fgrid, "max_read_gb": 0.0, "mmap": True}
+    )
+    for i in range(len(basis)):
+        assert g.norm2(basis2[i] - basis3[i]) == 0.0
+    for i in range(len(cevec)):
+        assert g.norm2(cevec2[i] - cevec3[i]) == 0.0
+
     # and load truncated and verify
     for ntrunc in [46, 32, 8]:
         g.message(
@@ -79,6 +79,8 @@ g.save(
 # - g.load(fn,{ "grids" : ..., "paths" :  ... })  both grids and paths are optional parameters and may be lists,
 #                                                 grids are re-used when loading, paths restricts which items to load (allows for glob.glob syntax /U/*)
 res = g.load(f"{work_dir}/out")
+assert res["va\nl"][0:4] == [0, 1, 3, "tes\n\0t"]
+assert res["va\nl"][6] == 1 + 3.1231251251234123413j
 
 for i in range(4):
     eps2 = g.norm2(res["U"][i] - U[i])
@@ -91,6 +93,76 @@ for i in range(4):
     g.message("Test second restore of U[%d]:" % i, eps2)
     assert eps2 < 1e-25
 
+# memory-mapped reads, views are distributed without intermediate copy
+res = g.load(f"{work_dir}/out2", {"paths": "/U/*", "mmap": True})
+for i in range(4):
+    eps2 = g.norm2(res["U"][i] - U[i])
+    g.message("Test memory-mapped restore of U[%d]:" % i, eps2)
+    assert eps2 < 1e-25
+
+# containers without binary index are read from the text index
+if g.rank() == 0:
+    os.unlink(f"{work_dir}/out2/index.bin")
+g.barrier()
+res2 = g.load(f"{work_dir}/out2")
+assert res2["val"][0:4] == [0, 1, 3, "test"]
+for i in range(4):
+    eps2 = g.norm2(res2["U"][i] - U[i])
+    g.message("Test restore of U[%d] from text index:" % i, eps2)
+    assert eps2 < 1e-25
+assert np.array_equal(res2["np"], g.coordinates(U[0].grid))
+
+# lossless and lossy codecs
+g.save(f"{work_dir}/out4", {"U": U}, codec="zlib")
+g.save(f"{work_dir}/out5", {"U": U}, codec="fp16")
+res = g.load(f"{work_dir}/out4")
+res_fp16 = g.load(f"{work_dir}/out5")
+for i in range(4):
+    eps2 = g.norm2(res["U"][i] - U[i])
+    g.message("Test zlib restore of U[%d]:" % i, eps2)
+    assert eps2 < 1e-25
+    eps2 = g.norm2(res_fp16["U"][i] - U[i]) / g.norm2(U[i])
+    g.message("Test fp16 restore of U[%d]:" % i, eps2)
+    assert eps2 < 1e-8
+
+# fp16 codec on fields with zero sites such as point sources
+Z = [g.lattice(U[0]), g.lattice(U[0])]
+Z[0][:] = 0
+Z[0][0, 0, 0, 0] = U[0][0, 0, 0, 0]
+Z[1][:] = 0
+g.save(f"{work_dir}/out6", {"Z": Z}, codec="fp16")
+res_fp16 = g.load(f"{work_dir}/out6")
+eps2 = g.norm2(res_fp16["Z"][0] - Z[0]) / g.norm2(Z[0])
+g.message("Test fp16 restore of point source:", eps2)
+assert eps2 < 1e-8
+assert g.norm2(res_fp16["Z"][0][1, 0, 0, 0]) == 0.0
+assert g.norm2(res_fp16["Z"][1]) == 0.0
+
+# append to an existing container, new objects form an additional chunk
+g.save(f"{work_dir}/out3", {"U": U[0:2]})
+g.save(f"{work_dir}/out3", {"U": U[2:4]}, g.format.gpt({"append": True}))
+
+# lazy load only reads lattices once they are accessed
+res = g.load(f"{work_dir}/out3", {"lazy": True})
+assert len(res) == 2
+for i in range(4):
+    u = res[i // 2]["U"][i % 2]
+    assert isinstance(u, g.gpt_io.lazy_lattice)
+    eps2 = g.norm2(u() - U[i])
+    g.message("Test appended and lazy restore of U[%d]:" % i, eps2)
+    assert eps2 < 1e-25
+
+# lazy loads do not keep file handles open
+n_fd = len(os.listdir("/proc/self/fd"))
+res = [g.load(f"{work_dir}/out3", {"lazy": True}) for i in range(64)]
+assert len(os.listdir("/proc/self/fd")) == n_fd
+for r in res:
+    r[1]["U"][0]()
+assert len(os.listdir("/proc/self/fd")) == n_fd
+eps2 = g.norm2(res[-1][1]["U"][0]() - U[2])
+assert eps2 < 1e-25
+del res
+
 # checkpointer save
 ckpt = g.checkpointer(f"{work_dir}/ckpt")
 alpha = 0.125
@@ -105,6 +177,80 @@ assert ckpt.load([U0_test, alpha])
 assert abs(alpha - 0.125) < 1e-25
 assert g.norm2(U0_test - U[0]) == 0.0
 
+# incremental checkpointer only writes changed blocks
+ckpt = g.checkpointer(f"{work_dir}/ckpt2", incremental=True, compress=True)
+U1 = g.copy(U[1])
+ckpt.save([U[0], U1])
+U1[0, 0, 0, 0] = U1[0, 0, 0, 1]
+ckpt.save([U[0], U1])
+
+ckpt = g.checkpointer(f"{work_dir}/ckpt2", incremental=True, compress=True)
+ckpt.grid = U[0].grid
+for U1_expected in [U[1], U1]:
+    U0_test, U1_test = g.lattice(U[0]), g.lattice(U[1])
+    assert ckpt.load([U0_test, U1_test])
+    assert g.norm2(U0_test - U[0]) == 0.0
+    assert g.norm2(U1_test - U1_expected) == 0.0
+assert not ckpt.load([U0_test, U1_test])
+
+# records are diffed against the same record of the previous save, such that
+# a single changed site costs at most one block per record
+block_size = 4096
+ckpt = g.checkpointer(f"{work_dir}/ckpt4", incremental=True, block_size=block_size)
+U1 = g.copy(U[1])
+ckpt.save([U[0], U1])
+ckpt.wait()
+size0 = os.path.getsize(ckpt.filename)
+U1[0, 0, 0, 0] = U1[0, 0, 0, 1]
+ckpt.save([U[0], U1])
+ckpt.close()
+header_size = 37
+growth = os.path.getsize(ckpt.filename) - size0
+assert growth <= 2 * header_size + 16 + block_size
+
+# resume in incremental mode from plain records, which serve as base
+ckpt = g.checkpointer(f"{work_dir}/ckpt5")
+ckpt.save([U[0]])
+ckpt.save([U[1]])
+ckpt.close()
+ckpt = g.checkpointer(f"{work_dir}/ckpt5", incremental=True)
+ckpt.grid = U[0].grid
+U0_test = g.lattice(U[0])
+for U_expected in [U[0], U[1]]:
+    assert ckpt.load([U0_test])
+    assert g.norm2(U0_test - U_expected) == 0.0
+U1 = g.copy(U[1])
+U1[0, 0, 0, 0] = U1[0, 0, 0, 1]
+ckpt.save([U1])
+ckpt.close()
+ckpt = g.checkpointer(f"{work_dir}/ckpt5", incremental=True)
+ckpt.grid = U[0].grid
+for U_expected in [U[0], U[1], U1]:
+    assert ckpt.load([U0_test])
+    assert g.norm2(U0_test - U_expected) == 0.0
+assert not ckpt.load([U0_test])
+
+# write-behind checkpointer works on a snapshot of the data
+ckpt = g.checkpointer(f"{work_dir}/ckpt3", staging_buffers=2)
+U1 = g.copy(U[1])
+ckpt.save([U[0], U1, alpha])
+U1 @= U[2]
+ckpt.close()
+
+ckpt = g.checkpointer(f"{work_dir}/ckpt3")
+ckpt.grid = U[0].grid
+U0_test, U1_test = g.lattice(U[0]), g.lattice(U[1])
+assert ckpt.load([U0_test, U1_test, alpha])
+assert g.norm2(U0_test - U[0]) == 0.0
+assert g.norm2(U1_test - U[1]) == 0.0
+
+# crc32 of concatenated data from checksums of the parts
+data = [memoryview(bytes(range(i, 3 * i + 7))) for i in range(3)]
+crc = g.crc32(data[0])
+for d in data[1:]:
+    crc = g.crc32_combine(crc, g.crc32(d), len(d))
+assert crc == g.crc32(memoryview(b"".join([bytes(d) for d in data])))
+
 # corr-io
 corr = [rng.normal().real for i in range(32)]
 w = g.corr_io.writer(f"{work_dir}/head.dat")
@@ -116,6 +262,48 @@ assert "test" in r.glob("*")
 for i in range(len(corr)):
     assert abs(r.tags["test"][i] - corr[i]) == 0.0
 
+# appended correlators are found through the sorted tag index
+w = g.corr_io.writer(f"{work_dir}/head.dat", append=True)
+for i in range(10):
+    w.write(f"pion/t{i}", [complex(i, j) for j in range(8)])
+w.write("test", corr[::-1])
+w.close()
+
+r = g.corr_io.reader(f"{work_dir}/head.dat")
+assert len(r.tags) == 11
+assert list(r.glob("pion/t1*")) == ["pion/t1"]
+assert "kaon/t1" not in r.tags
+assert np.array_equal(r.tags["pion/t3"], np.array([3 + 1j * j for j in range(8)]))
+assert np.array_equal(r.tags["test"], np.array(corr[::-1]))
+
+# writers that are not closed still write their buffer and index
+w = g.corr_io.writer(f"{work_dir}/head2.dat")
+w.write("test", corr)
+del w
+g.barrier()
+r = g.corr_io.reader(f"{work_dir}/head2.dat")
+assert np.array_equal(r.tags["test"], np.array(corr))
+
+# reader is a read-only dict in file order
+w = g.corr_io.writer(f"{work_dir}/head3.dat")
+for t in ["b", "a", "c"]:
+    w.write(t, corr)
+w.close()
+r = g.corr_io.reader(f"{work_dir}/head3.dat")
+assert list(r.tags) == ["b", "a", "c"]
+assert list(r.glob("*")) == ["b", "a", "c"]
+assert [t for t, c in r.tags.items()] == ["b", "a", "c"]
+assert all([np.array_equal(c, np.array(corr)) for c in r.tags.values()])
+assert r.tags.get("d") is None and r.tags.get("a") is not None
+
+# without index the record headers are scanned
+if g.rank() == 0:
+    os.unlink(f"{work_dir}/head.dat.index")
+g.barrier()
+r = g.corr_io.reader(f"{work_dir}/head.dat")
+assert sorted(r.glob("pion/*")) == [f"pion/t{i}" for i in range(10)]
+assert np.array_equal(r.tags["test"], np.array(corr[::-1]))
+
 # NERSC
 fn = "ckpoint.0000"
 g.save(fn, U, g.format.nersc())
@@ -125,3 +313,74 @@ for u_prime, u in zip(U_prime, U):
     eps = (g.norm2(u_prime - u) / g.norm2(u)) ** 0.5
     g.message(f"Test NERSC IO: {eps}")
     assert eps < 1e-14
+
+# synthetic NERSC files with two rows and single precision
+fdimensions = U[0].grid.fdimensions
+if g.rank() == 0:
+    t, z, y, x = np.meshgrid(
+        *[np.arange(fdimensions[i]) for i in reversed(range(4))], indexing="ij"
+    )
+    pos = np.stack((x, y, z, t), axis=-1).reshape(-1, 4).astype(np.int32)
+else:
+    pos = np.zeros((0, 4), dtype=np.int32)
+links = np.stack([u[pos] for u in U], axis=1)
+for rows, fp, fp_dtype, tolerance in [
+    (2, "IEEE64BIG", ">f8", 1e-14),
+    (3, "IEEE32", "<f4", 1e-6),
+    (2, "IEEE32BIG", ">f4", 1e-6),
+]:
+    fn = f"{work_dir}/ckpoint.{rows}.{fp}"
+    if g.rank() == 0:
+        data = np.ascontiguousarray(links[:, :, 0:rows, :]).view(np.float64)
+        data = data.astype(np.dtype(fp_dtype).newbyteorder("="))
+        checksum = int(np.sum(data.view(np.uint32), dtype=np.uint64)) & 0xFFFFFFFF
+        header = {
+            "DATATYPE": "4D_SU3_GAUGE" if rows == 2 else "4D_SU3_GAUGE_3x3",
+            "FLOATING_POINT": fp,
+            "CHECKSUM": "%x" % checksum,
+        }
+        for i in range(4):
+            header[f"DIMENSION_{i+1}"] = str(fdimensions[i])
+        with open(fn, "wb") as f:
+            f.write(b"BEGIN_HEADER\n")
+            for k in header:
+                f.write(f"{k} = {header[k]}\n".encode("utf-8"))
+            f.write(b"END_HEADER\n")
+            f.write(data.astype(fp_dtype).tobytes())
+    g.barrier()
+    U_prime = g.load(fn)
+    for u_prime, u in zip(U_prime, U):
+        eps = (g.norm2(u_prime - u) / g.norm2(u)) ** 0.5
+        g.message(f"Test NERSC IO with {rows} rows and {fp}: {eps}")
+        assert eps < tolerance
+
+# synthetic openQCD file, links of odd sites in the forward and backward
+# direction with time as direction 0
+if g.rank() == 0:
+    t, x, y, z = np.meshgrid(
+        *[np.arange(fdimensions[i]) for i in [3, 0, 1, 2]], indexing="ij"
+    )
+    pos = np.stack((x, y, z, t), axis=-1).reshape(-1, 4).astype(np.int32)
+    pos = np.ascontiguousarray(pos[np.sum(pos, axis=1) % 2 == 1])
+else:
+    pos = np.zeros((0, 4), dtype=np.int32)
+links = []
+for mu in [3, 0, 1, 2]:
+    pos_bwd = pos.copy()
+    pos_bwd[:, mu] = (pos_bwd[:, mu] - 1) % fdimensions[mu]
+    links += [U[mu][pos], U[mu][pos_bwd]]
+links = np.stack(links, axis=1)
+fn = f"{work_dir}/openQCD.conf"
+plaquette = g.qcd.gauge.plaquette(U)
+if g.rank() == 0:
+    with open(fn, "wb") as f:
+        header = [fdimensions[i] for i in [3, 0, 1, 2]]
+        f.write(np.array(header, dtype="<i4").tobytes())
+        f.write(np.array([3.0 * plaquette], dtype="<f8").tobytes())
+        f.write(links.astype("<c16").tobytes())
+g.barrier()
+U_prime = g.load(fn)
+for u_prime, u in zip(U_prime, U):
+    eps = (g.norm2(u_prime - u) / g.norm2(u)) ** 0.5
+    g.message(f"Test openQCD IO: {eps}")
+    assert eps < 1e-14
@@ -22,6 +22,62 @@ eps = abs(P - R_1x1)
 g.message(f"Plaquette {P} versus 1x1 rectangle {R_1x1}: {eps}")
 assert eps < 1e-13
 
+# Test re-use of transport buffers and streaming of traces
+paths = [
+    g.qcd.gauge.path().f(0, 2).f(1, 1).b(0, 2).b(1, 1),
+    g.qcd.gauge.path().f(2, 1).f(3, 1).b(2, 1).b(3, 1),
+]
+transport = g.qcd.gauge.transport(U, paths)
+P_paths = list(transport(U))
+for i in range(2):
+    P_paths_2 = list(transport(U))
+    assert all([a is b for a, b in zip(P_paths, P_paths_2)])
+traces = transport.trace_sum(U)
+for p, tr in zip(P_paths, traces):
+    eps = abs(g.sum(g.trace(p)) - tr) / abs(tr)
+    g.message(f"Streamed trace of transported path: {eps}")
+    assert eps < 1e-13
+
+# Test shared prefixes of transported paths
+paths = [
+    g.qcd.gauge.path().f(0, R).f(3, T).b(0, R).b(3, T)
+    for R in range(1, 4)
+    for T in range(1, 4)
+]
+transport = g.qcd.gauge.transport(U, paths)
+g.message(
+    f"Transport uses {transport.multiplications} instead of {transport.multiplications_naive} multiplications"
+)
+assert transport.multiplications < transport.multiplications_naive
+for p, W in zip(paths, transport(U)):
+    # compare against transport of the single path without shared prefixes
+    W_ref = next(g.qcd.gauge.transport(U, [p])(U))
+    eps2 = g.norm2(W - W_ref) / g.norm2(W)
+    assert eps2 < 1e-26
+
+# Test Wilson and Polyakov loops against rectangles and direct evaluation
+shapes = [g.qcd.gauge.path().f(0, 2), g.qcd.gauge.path().f(1, 1).f(2, 1)]
+W, P_loop = g.qcd.gauge.wilson_loops(U, shapes, polyakov=True)
+assert W[0].shape == (8, 16)
+for T in [1, 3]:
+    R_ref = g.qcd.gauge.rectangle(U, [[(0, 2, 3, T)]])
+    eps = abs(np.mean(W[0][T - 1]) - R_ref)
+    g.message(f"Wilson loop 2x{T} versus rectangle: {eps}")
+    assert eps < 1e-13
+transport = g.qcd.gauge.transport(U, [g.qcd.gauge.path().f(3, 16)])
+P_ref = transport.trace_sum(U)[0] / U[0].grid.fsites / 3
+eps = abs(P_loop - P_ref)
+g.message(f"Polyakov loop {P_loop} versus transport: {eps}")
+assert eps < 1e-13
+
+# Wilson loops on a different volume with the same temporal extent
+U_small = g.qcd.gauge.random(g.grid([4, 4, 4, 16], g.double), rng)
+W = g.qcd.gauge.wilson_loops(U_small, shapes)
+R_ref = g.qcd.gauge.rectangle(U_small, [[(0, 2, 3, 2)]])
+eps = abs(np.mean(W[0][1]) - R_ref)
+g.message(f"Wilson loop 2x2 on second grid versus rectangle: {eps}")
+assert eps < 1e-13
+
 # Test gauge invariance of plaquette
 P_transformed = g.qcd.gauge.plaquette(U_transformed)
 eps = abs(P - P_transformed)
@@ -54,6 +110,20 @@ for mu in range(len(C)):
     )
     assert eps < 1e-14
 
+# Test re-use of shifted links within an eval_scope
+with g.eval_scope() as scope:
+    a = g.cshift(U[0], 1, 1)
+    b = g.cshift(U[0], 1, 1)
+    c = g.cshift(g.adj(U[0]), 1, 1)
+    assert a is b and a is not c and scope.hits == 1
+C_0 = g.lattice(U[0])
+C_0[:] = 0
+for nu in range(1, 4):
+    C_0 += rho[0, nu] * g.qcd.gauge.staple(U, 0, nu)
+eps2 = g.norm2(C_0 - C[0]) / g.norm2(C_0)
+g.message(f"Staple sum with and without shared shifts: {eps2}")
+assert eps2 < 1e-28
+
 
 # Test stout smearing
 U_stout = U
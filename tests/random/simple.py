@@ -131,4 +131,27 @@ test_sequence_ref = np.array(
 err = np.linalg.norm(test_sequence_comp - test_sequence_ref)
 assert err < 1e-14
 
+# per-site streams only depend on the global coordinate and the number of draws
+rng = g.random("block_seed_string_13")
+v = g.vcolor(grid_dp)
+w = g.vcolor(grid_dp)
+rng.skip(2)
+rng.cnormal(v, coordinates=g.coordinates(v))
+
+rng = g.random("block_seed_string_13")
+rng.cnormal(w, coordinates=g.coordinates(w))
+assert g.norm2(v - w) > 1e-3
+pos = g.coordinates(w)
+pos = pos[pos[:, 3] == 5]
+w[:] = 0
+rng.skip(1)
+rng.cnormal(w, coordinates=pos)
+assert np.linalg.norm(w[pos] - v[pos]) < 1e-14
+
+# substreams are reproducible and independent
+a = g.random("block_seed_string_13").substream("wall").normal()
+b = g.random("block_seed_string_13").substream("wall").normal()
+c = g.random("block_seed_string_13").substream("point").normal()
+assert a == b and a != c
+
 g.message("All tests passed")